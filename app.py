@@ -1,16 +1,25 @@
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from flask import Flask, request, jsonify, send_from_directory, render_template, make_response, Response, stream_with_context
 # Import database components
-from database import db, Report, ProductMapping, BrandMapping, KnownProductName, init_db
-from data_processor import process_manufacturer_data
-from report_generator import generate_summary_report
+from database import db, Report, ProductMapping, BrandMapping, KnownProductName, init_db, search_filter, get_table_versions
+from init_on_startup import seed_database_if_empty
+from mapping_bulk import (
+    clean_product_rows, clean_brand_rows, clean_known_name_rows,
+    upsert_product_mappings, upsert_brand_mappings, upsert_known_names,
+    read_rows_from_file, PRODUCT_COLUMN_ALIASES, BRAND_COLUMN_ALIASES, KNOWN_NAME_COLUMN_ALIASES
+)
+from mapping_export import export_stream, EXPORT_FORMATS
+from name_matcher import get_snapshot
+from upload_catalog import catalog_file, inspect_workbook, sync_catalog
 from werkzeug.utils import secure_filename
 import os
 import uuid
 import json
+import base64
+import hashlib
+import threading
+from datetime import datetime, timedelta
 from config import UPLOAD_FOLDER, REPORT_FOLDER, ALLOWED_EXTENSIONS, SQLALCHEMY_DATABASE_URI
-# Import other modules
-# from database import db
-# from report_generator import generate_summary_report
+# data_processor and report_generator (pandas/numpy) are imported lazily in the report endpoint
 
 app = Flask(__name__, static_folder='client')
 app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI  # Use config from config.py (supports both PostgreSQL and SQLite)
@@ -24,6 +33,13 @@ init_db(app) # Initialize database tables
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(REPORT_FOLDER, exist_ok=True)
 
+# Seed empty mapping tables (a single cheap query when already populated)
+with app.app_context():
+    try:
+        seed_database_if_empty(UPLOAD_FOLDER)
+    except Exception as e:
+        print(f"Warning: Could not seed database on startup: {e}")
+
 # --- This is the critical part ---
 @app.route('/')
 def index():
@@ -54,45 +70,256 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def bulk_items_from_request(column_aliases):
+    """
+    Collect bulk items from either an uploaded CSV/XLSX ('file' form field)
+    or a JSON body (a list, or {"items": [...]}).
+    Returns (items, error_message).
+    """
+    if 'file' in request.files:
+        try:
+            return read_rows_from_file(request.files['file'], column_aliases), None
+        except Exception as e:
+            return None, f"Could not read file: {e}"
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        return None, "Expected a JSON array, {\"items\": [...]}, or an uploaded file"
+    return data, None
+
+def run_bulk_upsert(column_aliases, clean_rows, upsert):
+    """Shared request handling for the bulk upsert endpoints."""
+    items, error = bulk_items_from_request(column_aliases)
+    if error:
+        return jsonify({"error": error}), 400
+
+    rows, errors = clean_rows(items)
+    if errors:
+        return jsonify({"error": "Invalid rows", "rows": errors[:100], "invalid_count": len(errors)}), 400
+
+    try:
+        counts = upsert(rows)
+        return jsonify(counts), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Bulk upsert failed: {str(e)}"}), 500
+
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
     """
     Handles multiple file uploads from manufacturers.
+
+    Each saved workbook is cataloged (header row and dimensions only, see
+    upload_catalog). Unreadable workbooks are rejected. Workbooks matching
+    no known schema are accepted with a warning, or rejected when the form
+    field or query parameter `strict` is set.
     """
     if 'files[]' not in request.files:
         return jsonify({"error": "No file part in the request"}), 400
     
     uploaded_files = request.files.getlist('files[]')
+    strict = (request.form.get('strict') or request.args.get('strict')) in ('1', 'true')
     
     # List to store the paths of saved files
     file_paths = []
+    cataloged = []
+    rejected = []
     
     for file in uploaded_files:
         if file and allowed_file(file.filename):
             # Secure the filename to prevent path traversal attacks
             filename = secure_filename(file.filename)
             file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
+
+            # Sniff under a temporary name first, so a rejected upload never
+            # replaces an accepted workbook of the same name ('~$' files are
+            # ignored by the catalog)
+            temp_path = os.path.join(UPLOAD_FOLDER, f"~${uuid.uuid4().hex}_{filename}")
+            file.save(temp_path)
+            inspected = inspect_workbook(temp_path)
+            if inspected['error'] or (strict and inspected['schema'] is None):
+                reason = inspected['error'] or f"Unknown schema, missing columns: {', '.join(inspected['missing'])}"
+                rejected.append({"filename": filename, "reason": reason})
+                os.remove(temp_path)
+                continue
+
+            os.replace(temp_path, file_path)
+            entry = catalog_file(file_path, inspected=inspected)
             file_paths.append(file_path)
+            cataloged.append(entry.to_dict())
         
     # Trigger the processing job asynchronously for a real application
     # For a simple skeleton, we can call the processing function directly:
     # report_id = generate_summary_report(file_paths, request.form.get('date_range'))
     
+    if rejected and not file_paths:
+        return jsonify({"error": "No valid files uploaded", "rejected": rejected}), 400
+
     return jsonify({
         "message": f"Successfully uploaded {len(file_paths)} files.", 
-        "file_paths": file_paths
+        "file_paths": file_paths,
+        "files": cataloged,
+        "warnings": [f"{f['filename']}: unknown schema, missing columns: {', '.join(f['missing_columns'])}"
+                     for f in cataloged if f['schema'] is None],
+        "rejected": rejected
     }), 202 # 202 Accepted, as processing may take time
 
+@app.route('/api/uploads', methods=['GET'])
+def list_uploads():
+    """
+    Upload catalog: one entry per workbook in the uploads folder, re-sniffed
+    only when a file changed on disk. Optional ?schema=manufacturer|mapping_source|unknown
+    """
+    schema = request.args.get('schema')
+    try:
+        entries = [entry.to_dict() for _, entry in sync_catalog(UPLOAD_FOLDER)]
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Could not read the upload catalog: {str(e)}"}), 500
+    if schema:
+        entries = [e for e in entries if (e['schema'] or 'unknown') == schema]
+    return jsonify({"items": entries, "total": len(entries)}), 200
+
+# Upper bound on the report param 'workers' (aggregation processes)
+MAX_REPORT_WORKERS = os.cpu_count() or 1
+
+def report_params_error(report_params):
+    """Why report params can't be run (for a 400 response), or None when they can."""
+    workers = report_params.get('workers')
+    if workers is None or workers == 'auto':
+        return None
+    if isinstance(workers, str) and workers.isdigit():
+        workers = int(workers)
+    if isinstance(workers, bool) or not isinstance(workers, int) or not 1 <= workers <= MAX_REPORT_WORKERS:
+        return f"workers must be 'auto' or a whole number from 1 to {MAX_REPORT_WORKERS}"
+    return None
+
+def build_mapping_config(report_params, snapshot=None, progress=None):
+    """process_manufacturer_data() options from the report params."""
+    return {
+        'include_suggestions': bool(report_params.get('include_suggestions')),
+        # Bounded-memory chunked aggregation for very large batches
+        'streaming': bool(report_params.get('streaming')),
+        # Categorical keys / narrow numerics for the in-memory path
+        'compact': bool(report_params.get('compact')),
+        'arrow_strings': bool(report_params.get('arrow_strings')),
+        # Hash-sharded aggregation across processes (int or 'auto')
+        'workers': report_params.get('workers'),
+        # Rows repeated across uploaded files: flag (default, count only), drop or off
+        'dedup': report_params.get('dedup'),
+        # Batch jobs pass the snapshot they share across reports
+        'snapshot': snapshot,
+        # Stage callback feeding the progress stream
+        'progress': progress,
+    }
+
+def run_report(report, file_paths, report_params, snapshot=None, progress=None):
+    """
+    Process the files and write the report for a PENDING Report row, then
+    mark it COMPLETE. Exceptions propagate; the caller records the ERROR
+    (mark_report_failed).
+
+    Stages are reported to `progress`, a ProgressTracker registered for the
+    report unless one is passed, and end with a 'done' event.
+
+    Returns:
+        the processed summary DataFrame
+    """
+    # Imported here so pandas/numpy only load on the report path, not on worker boot
+    from data_processor import process_manufacturer_data
+    from report_generator import generate_summary_report
+    from report_progress import start_tracking
+
+    progress = progress or start_tracking(report.id)
+
+    # --- Start Data Processing ---
+    summary_data = process_manufacturer_data(file_paths, build_mapping_config(report_params, snapshot, progress))
+
+    # This function returns the physical filename (e.g., 'BOARD-S-1234.xlsx')
+    report_filename = generate_summary_report(summary_data, report_params, report_id=report.id, progress=progress)
+    save_report_preview(report.id, summary_data)
+
+    # Optionally keep each upload's partial aggregates for later SQL consolidation
+    if report_params.get('store_facts'):
+        from fact_store import ingest_upload
+        snapshot = snapshot or get_snapshot()
+        for path in file_paths:
+            try:
+                ingest_upload(path, snapshot)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Warning: Could not store facts for {path}: {e}")
+
+    # --- Update Database (Status: COMPLETE) ---
+    dedup_stats = summary_data.attrs.get('dedup_stats')
+    report.status = 'COMPLETE'
+    report.filename = report_filename
+    report.dedup_stats = json.dumps(dedup_stats, ensure_ascii=False) if dedup_stats else None
+    db.session.commit()
+    progress('done', rows=len(summary_data), download_url=f"/api/report/download/{report.id}",
+             dedup_stats=dedup_stats)
+    return summary_data
+
+def save_report_preview(report_id, summary_data):
+    """Cache the JSON preview of a finished report; the report itself is unaffected on failure."""
+    from report_preview import write_preview
+    try:
+        write_preview(report_id, summary_data, {'dedup_stats': summary_data.attrs.get('dedup_stats')})
+    except Exception as e:
+        print(f"Warning: Could not write preview for report {report_id}: {e}")
+
+def mark_report_failed(report, error):
+    from report_progress import get_tracker
+
+    db.session.rollback()
+    report.status = 'ERROR'
+    # Log the error message (optional, but good practice)
+    report.filename = f"ERROR: {str(error)[:200]}"
+    db.session.commit()
+
+    tracker = get_tracker(report.id)
+    if tracker is not None:
+        tracker('error', message=str(error)[:200])
+
+def run_report_in_context(report_id, file_paths, report_params, snapshot=None, progress=None):
+    """
+    Worker thread (batch groups, async generation): generate one report in
+    its own app context and session.
+
+    Returns:
+        None on success, else the error message
+    """
+    with app.app_context():
+        report = db.session.get(Report, report_id)
+        try:
+            run_report(report, file_paths, report_params, snapshot, progress)
+            return None
+        except Exception as e:
+            mark_report_failed(report, e)
+            return str(e)
+        finally:
+            db.session.remove()
+
 @app.route('/api/report/generate', methods=['POST'])
 def generate_report_endpoint():
     """
     Triggers the data processing and report generation.
     Takes parameters (e.g., date range, filter) from the request body.
+
+    With "async": true the report runs in a background thread and the
+    response (202) returns at once with the report ID; follow
+    /api/report/<report_id>/progress until its 'done' or 'error' event.
     """
     data = request.get_json()
     uploaded_file_paths = data.get('file_paths', [])
     report_params = data.get('params', {})
+    run_async = bool(data.get('async'))
+
+    params_error = report_params_error(report_params)
+    if params_error:
+        return jsonify({"error": params_error}), 400
     
     # 1. Generate a unique ID for the report
     report_id = str(uuid.uuid4())[:8].upper()
@@ -108,19 +335,25 @@ def generate_report_endpoint():
     try:
         db.session.add(new_report)
         db.session.commit()
+
+        if run_async:
+            from report_progress import start_tracking
+            # Registered before the thread starts, so the stream finds it right away
+            tracker = start_tracking(report_id)
+            threading.Thread(
+                target=run_report_in_context,
+                args=(report_id, uploaded_file_paths, report_params, None, tracker),
+                daemon=True
+            ).start()
+            return jsonify({
+                "report_id": report_id,
+                "status": "PENDING",
+                "progress_url": f"/api/report/{report_id}/progress",
+                "message": "Report generation started."
+            }), 202
         
         # 3. Process Data and Generate Report
-        
-        # --- Start Data Processing ---
-        summary_data = process_manufacturer_data(uploaded_file_paths, {}) # Pass actual config
-        
-        # This function returns the physical filename (e.g., 'BOARD-S-1234.xlsx')
-        report_filename = generate_summary_report(summary_data, report_params) 
-        
-        # --- Update Database (Status: COMPLETE) ---
-        new_report.status = 'COMPLETE'
-        new_report.filename = report_filename
-        db.session.commit()
+        summary_data = run_report(new_report, uploaded_file_paths, report_params)
         
         download_url = f"/api/report/download/{report_id}"
         
@@ -128,16 +361,13 @@ def generate_report_endpoint():
             "report_id": report_id,
             "status": "Processing complete (download available)",
             "download_url": download_url,
+            "dedup_stats": summary_data.attrs.get('dedup_stats'),
             "message": "Report generated successfully."
         }), 201
 
     except Exception as e:
         # 4. Handle Errors: Update status to ERROR if anything goes wrong
-        db.session.rollback()
-        new_report.status = 'ERROR'
-        # Log the error message (optional, but good practice)
-        new_report.filename = f"ERROR: {str(e)[:200]}" 
-        db.session.commit()
+        mark_report_failed(new_report, e)
     
         return jsonify({
             "report_id": report_id,
@@ -145,6 +375,167 @@ def generate_report_endpoint():
             "message": f"Report generation failed. Error: {e}"
         }), 500
 
+def report_state(report):
+    """Progress state of a report from its database row, for streams without a tracker."""
+    stage = {'COMPLETE': 'done', 'ERROR': 'error'}.get(report.status, 'queued')
+    state = {'report_id': report.id, 'stage': stage, 'status': report.status}
+    if stage == 'done':
+        state['download_url'] = f"/api/report/download/{report.id}"
+    elif stage == 'error':
+        state['message'] = (report.filename or '').removeprefix('ERROR: ')
+    return state
+
+@app.route('/api/report/<report_id>/progress', methods=['GET'])
+def report_progress_stream(report_id):
+    """
+    Server-Sent Events stream of a report's generation: 'progress' events
+    (stage parsing/matching/aggregating/writing, file and files while
+    parsing, rows, percent, eta in seconds), then one 'done' event with the
+    download_url or an 'error' event with the message. Each stream closes
+    after MAX_STREAM_SECONDS and EventSource reconnects by itself.
+
+    A report run by another worker process has no tracker here; its stream
+    carries its database status only ('queued' until it finishes).
+    """
+    from report_progress import get_tracker, progress_events, status_events
+
+    tracker = get_tracker(report_id)
+    if tracker is not None:
+        events = progress_events(tracker)
+    else:
+        report = db.session.get(Report, report_id)
+        if not report:
+            return jsonify({"error": "Report not found."}), 404
+        events = status_events(report_state(report))
+
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        # No caching, and no proxy buffering (nginx) of the event stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/report/<report_id>/preview', methods=['GET'])
+def preview_report(report_id):
+    """
+    First rows of a finished report's summary as paginated JSON, with totals
+    and unmatched-product counts, served from the preview cached at
+    generation time. Query params: page (default 1), per_page (default 50, max 500)
+    """
+    from report_preview import load_preview, preview_page, DEFAULT_PREVIEW_ROWS
+
+    report = db.session.get(Report, report_id)
+    if not report or report.status != 'COMPLETE':
+        return jsonify({"error": "Report not found or not yet complete."}), 404
+
+    preview = load_preview(report_id)
+    if preview is None:
+        return jsonify({"error": "No preview available for this report."}), 404
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', DEFAULT_PREVIEW_ROWS, type=int)
+    return jsonify(preview_page(preview, page, per_page)), 200
+
+# ===== Batch Reports =====
+
+# Upper bound on report groups per batch
+MAX_BATCH_GROUPS = 50
+# Concurrent report groups per batch
+BATCH_WORKERS = min(4, os.cpu_count() or 1)
+
+def batch_entry_name(name):
+    """Zip entry name for a group: its name without path separators or control characters."""
+    cleaned = ''.join('_' if c in '/\\:*?"<>|' or ord(c) < 32 else c for c in name).strip(' .')
+    return cleaned or 'report'
+
+@app.route('/api/report/batch', methods=['POST'])
+def generate_report_batch():
+    """
+    Generate one report per named file group in a single job.
+
+    Body: {"groups": [{"name": "Supplier A", "file_paths": [...], "params": {...}}, ...]}
+
+    The mapping snapshot (matcher, brand and weight/size lookups) is built
+    once and shared by every group; groups run concurrently in threads. Each
+    group gets its own Report row. The finished reports are zipped, one
+    <name>.xlsx entry per successful group.
+    """
+    data = request.get_json(silent=True) or {}
+    groups = data.get('groups')
+    if not isinstance(groups, list) or not groups:
+        return jsonify({"error": "Expected {\"groups\": [{\"name\", \"file_paths\", \"params\"}, ...]}"}), 400
+    if len(groups) > MAX_BATCH_GROUPS:
+        return jsonify({"error": f"At most {MAX_BATCH_GROUPS} groups per batch"}), 400
+    if any(not isinstance(g, dict) or not isinstance(g.get('params') or {}, dict) for g in groups):
+        return jsonify({"error": "Every group must be an object whose params, if given, is an object"}), 400
+
+    names = [batch_entry_name(str(g.get('name') or f'report_{i + 1}')) for i, g in enumerate(groups)]
+    if len(set(names)) != len(names):
+        return jsonify({"error": "Group names must be unique"}), 400
+    if any(not isinstance(g.get('file_paths'), list) or not g['file_paths'] for g in groups):
+        return jsonify({"error": "Every group needs a non-empty file_paths list"}), 400
+    for name, group in zip(names, groups):
+        params_error = report_params_error(group.get('params') or {})
+        if params_error:
+            return jsonify({"error": f"{name}: {params_error}"}), 400
+
+    batch_id = str(uuid.uuid4())[:8].upper()
+    reports = []
+    for name, group in zip(names, groups):
+        params = group.get('params') or {}
+        report = Report(
+            id=str(uuid.uuid4())[:8].upper(),
+            status='PENDING',
+            parameters=json.dumps({**params, 'batch_id': batch_id, 'group': name}),
+            source_files=json.dumps(group['file_paths'])
+        )
+        db.session.add(report)
+        reports.append((name, report.id, group['file_paths'], params))
+    db.session.commit()
+
+    from concurrent.futures import ThreadPoolExecutor
+    import zipfile
+
+    snapshot = get_snapshot()
+    with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(reports))) as pool:
+        futures = [pool.submit(run_report_in_context, report_id, paths, params, snapshot)
+                   for _, report_id, paths, params in reports]
+        errors = [future.result() for future in futures]
+
+    results = []
+    zip_filename = f"report_batch_{batch_id}.zip"
+    with zipfile.ZipFile(os.path.join(REPORT_FOLDER, zip_filename), 'w', zipfile.ZIP_DEFLATED) as archive:
+        for (name, report_id, _, _), error in zip(reports, errors):
+            report = db.session.get(Report, report_id)
+            db.session.refresh(report)
+            if error is None:
+                archive.write(os.path.join(REPORT_FOLDER, report.filename), f"{name}.xlsx")
+            results.append({
+                "name": name,
+                "report_id": report_id,
+                "status": report.status,
+                "download_url": f"/api/report/download/{report_id}" if error is None else None,
+                "error": error,
+            })
+
+    completed = sum(1 for r in results if r['error'] is None)
+    return jsonify({
+        "batch_id": batch_id,
+        "reports": results,
+        "download_url": f"/api/report/batch/{batch_id}/download" if completed else None,
+        "message": f"{completed} of {len(results)} reports generated."
+    }), 201 if completed else 500
+
+@app.route('/api/report/batch/<batch_id>/download', methods=['GET'])
+def download_report_batch(batch_id):
+    """Download the zip of a batch's reports."""
+    if not batch_id.isalnum():
+        return jsonify({"error": "Batch not found."}), 404
+    zip_filename = f"report_batch_{batch_id}.zip"
+    if not os.path.exists(os.path.join(REPORT_FOLDER, zip_filename)):
+        return jsonify({"error": "Batch not found."}), 404
+    return send_from_directory(REPORT_FOLDER, zip_filename, as_attachment=True)
+
 
 @app.route('/api/report/download/<report_id>', methods=['GET'])
 def download_report(report_id):
@@ -162,6 +553,329 @@ def download_report(report_id):
 
     return send_from_directory(REPORT_FOLDER, filename, as_attachment=True)
 
+# ===== Fact Store =====
+
+@app.route('/api/facts/ingest', methods=['POST'])
+def ingest_facts():
+    """
+    Store per-upload partial aggregates for SQL consolidation (see fact_store).
+    Body (optional): {"file_paths": [...], "replace": false}; without
+    file_paths, every cataloged manufacturer workbook in uploads/ is ingested.
+    Uploads whose content hash is already stored are skipped unless replace is set.
+    """
+    # Imported here so pandas only loads when facts are ingested
+    from fact_store import ingest_upload
+
+    data = request.get_json(silent=True) or {}
+    replace = bool(data.get('replace'))
+    if data.get('file_paths'):
+        targets = [(path, None) for path in data['file_paths']]
+    else:
+        targets = [(path, entry.content_hash) for path, entry in sync_catalog(UPLOAD_FOLDER)
+                   if entry.detected_schema == 'manufacturer']
+
+    snapshot = get_snapshot()
+    results, errors = [], []
+    for path, upload_hash in targets:
+        try:
+            results.append(ingest_upload(path, snapshot, upload_hash=upload_hash, replace=replace))
+        except Exception as e:
+            db.session.rollback()
+            errors.append({"file": os.path.basename(path), "error": str(e)})
+
+    return jsonify({"items": results, "errors": errors}), 200
+
+@app.route('/api/facts/consolidate', methods=['POST'])
+def consolidate_facts():
+    """
+    Board summary over stored uploads with one SQL GROUP BY, no Excel parsing.
+    Body: {"days": 90} or {"since": "2026-07-01", "until": "2026-10-01"},
+    optional "upload_hashes": [...], "format": "json" (default) or "xlsx".
+    xlsx writes a report like /api/report/generate and returns its download URL.
+    """
+    from fact_store import consolidate
+
+    data = request.get_json(silent=True) or {}
+    try:
+        since = datetime.fromisoformat(data['since']) if data.get('since') else None
+        until = datetime.fromisoformat(data['until']) if data.get('until') else None
+        if data.get('days') is not None:
+            since = datetime.utcnow() - timedelta(days=float(data['days']))
+    except (TypeError, ValueError, OverflowError):  # OverflowError: days beyond datetime's range
+        return jsonify({"error": "since/until must be ISO dates and days a number"}), 400
+
+    export_format = data.get('format', 'json')
+    if export_format not in ('json', 'xlsx'):
+        return jsonify({"error": "format must be json or xlsx"}), 400
+
+    summary_df = consolidate(get_snapshot(), since=since, until=until, upload_hashes=data.get('upload_hashes'))
+    consolidation = summary_df.attrs['consolidation']
+
+    if export_format == 'json':
+        items = summary_df.astype(object).where(summary_df.notna(), None).to_dict('records')
+        return jsonify({"items": items, "consolidation": consolidation}), 200
+
+    from report_generator import generate_summary_report
+
+    report_params = data.get('params', {})
+    report = Report(
+        id=str(uuid.uuid4())[:8].upper(),
+        status='COMPLETE',
+        parameters=json.dumps({**report_params, 'consolidation': {k: data.get(k) for k in ('days', 'since', 'until')}}),
+        source_files=json.dumps([u['upload_hash'] for u in consolidation['uploads']])
+    )
+    report.filename = generate_summary_report(summary_df, report_params, report_id=report.id)
+    save_report_preview(report.id, summary_df)
+    db.session.add(report)
+    db.session.commit()
+
+    return jsonify({
+        "report_id": report.id,
+        "download_url": f"/api/report/download/{report.id}",
+        "consolidation": consolidation
+    }), 201
+
+# ===== Name Resolution API =====
+
+# Upper bound on items per /api/resolve call
+MAX_RESOLVE_BATCH = 10000
+
+@app.route('/api/resolve', methods=['POST'])
+def resolve_names():
+    """
+    Resolve raw product names and brands the same way the report pipeline does.
+
+    Body: {"items": [{"name": "...", "brand": "..."}, ...]} (plain name strings are accepted too)
+    Returns one result per item, in order, with the canonical 品名, the
+    reference brand and the box weight/size from ProductMapping.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON body with an 'items' list"}), 400
+    if len(items) > MAX_RESOLVE_BATCH:
+        return jsonify({"error": f"At most {MAX_RESOLVE_BATCH} items per request"}), 400
+
+    snapshot = get_snapshot()
+    results = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            name, brand = item, None
+        elif isinstance(item, dict):
+            name, brand = item.get('name'), item.get('brand')
+        else:
+            name, brand = None, None
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({"error": f"Item {index}: name is required"}), 400
+        results.append(snapshot.resolve(name.strip(), brand.strip() if isinstance(brand, str) else None))
+
+    matched = sum(1 for r in results if r['matched'])
+    return jsonify({
+        "results": results,
+        "count": len(results),
+        "matched": matched,
+    }), 200
+
+@app.route('/api/coverage', methods=['GET'])
+def get_coverage():
+    """
+    ProductMapping coverage of the Excel files in the uploads folder, computed
+    with the production matching engine. Workbook parses are cached on disk;
+    pass ?refresh=1 to re-parse every file.
+    """
+    # Imported here so pandas only loads when coverage is requested
+    from coverage_analyzer import analyze_coverage, list_excel_files
+
+    files = list_excel_files(UPLOAD_FOLDER)
+    use_cache = request.args.get('refresh') not in ('1', 'true')
+    try:
+        return jsonify(analyze_coverage(files, get_snapshot(), use_cache=use_cache)), 200
+    except Exception as e:
+        return jsonify({"error": f"Coverage analysis failed: {str(e)}"}), 500
+
+# ===== Shared list helpers =====
+
+# Upper bound on keyset page size and on rows counted for an estimated total
+MAX_CURSOR_PAGE_SIZE = 1000
+ESTIMATE_COUNT_CAP = 10000
+
+def encode_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Sort value a cursor points after, or None when the cursor is malformed."""
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except ValueError:  # bad base64, UTF-8 or JSON (all ValueError subclasses)
+        return None
+    # Cursors only ever encode a string sort column value
+    return after if isinstance(after, str) else None
+
+def estimate_total(model, query, searching):
+    """
+    Cheap row count estimate: planner statistics for an unfiltered PostgreSQL
+    table, otherwise a count capped at ESTIMATE_COUNT_CAP rows.
+    Returns (total, is_capped).
+    """
+    if not searching and db.session.get_bind().dialect.name == 'postgresql':
+        reltuples = db.session.execute(
+            db.text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+            {'table': model.__tablename__}
+        ).scalar()
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples), False
+
+    capped = query.order_by(None).limit(ESTIMATE_COUNT_CAP + 1).subquery()
+    count = db.session.execute(db.select(db.func.count()).select_from(capped)).scalar()
+    return min(count, ESTIMATE_COUNT_CAP), count > ESTIMATE_COUNT_CAP
+
+def list_mappings(model, sort_name, search_columns, default_per_page):
+    """
+    Shared implementation of the mapping list endpoints.
+
+    Without `cursor` this is the page/per_page listing used by the management
+    pages. With `cursor` it is keyset pagination on the unique sort column:
+    no OFFSET scan, and no COUNT(*) unless `total` asks for one.
+    """
+    search = request.args.get('search', '').strip()
+    per_page = request.args.get('per_page', default_per_page, type=int)
+    sort_column = getattr(model, sort_name)
+
+    query = model.query
+    if search:
+        query = query.filter(search_filter(model, search_columns, search))
+
+    if 'cursor' not in request.args:
+        page = request.args.get('page', 1, type=int)
+        pagination = query.order_by(sort_column).paginate(page=page, per_page=per_page, error_out=False)
+        return jsonify({
+            'items': [item.to_dict() for item in pagination.items],
+            'total': pagination.total,
+            'page': page,
+            'per_page': per_page,
+            'pages': pagination.pages
+        }), 200
+
+    per_page = max(1, min(per_page, MAX_CURSOR_PAGE_SIZE))
+    cursor = request.args.get('cursor', '')
+    page_query = query
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        page_query = page_query.filter(sort_column > after)
+
+    items = page_query.order_by(sort_column).limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    response = {
+        'items': [item.to_dict() for item in items],
+        'per_page': per_page,
+        'next_cursor': encode_cursor(getattr(items[-1], sort_name)) if has_more else None,
+    }
+
+    total_mode = request.args.get('total')
+    if total_mode == 'exact':
+        response['total'] = query.order_by(None).count()
+    elif total_mode == 'estimate':
+        response['total'], response['total_capped'] = estimate_total(model, query, bool(search))
+
+    return jsonify(response), 200
+
+def conditional_json(tables, build, versions=None):
+    """
+    Serve the JSON response from build() with an ETag derived from the
+    change counters of `tables` and the request URL. A matching
+    If-None-Match gets 304 Not Modified without running build() at all.
+    """
+    versions = versions or get_table_versions(tables)
+    etag = hashlib.sha1(json.dumps([versions, request.full_path]).encode('utf-8')).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    # Clients may cache but must revalidate every time
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def export_response(table_key):
+    """
+    Stream a whole mapping table as a file download.
+    Query params:
+    - format: csv (default), jsonl or xlsx
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    filename = f"{table_key}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(export_stream(table_key, export_format)),
+        content_type=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+# ===== Dashboard Statistics =====
+
+# Last computed stats per process, reused until a table change counter moves
+_stats_cache = {'versions': None, 'stats': None}
+
+def compute_stats():
+    """Table counts, ProductMapping coverage and report counts by status."""
+    weight = ProductMapping.box_weight
+    size = ProductMapping.box_size
+    total, with_weight, with_size, with_neither = db.session.execute(db.select(
+        db.func.count(),
+        db.func.count(weight),
+        db.func.count(size),
+        db.func.coalesce(db.func.sum(db.case((db.and_(weight.is_(None), size.is_(None)), 1), else_=0)), 0),
+    ).select_from(ProductMapping)).one()
+
+    by_status = dict(db.session.execute(
+        db.select(Report.status, db.func.count()).group_by(Report.status)
+    ).all())
+
+    return {
+        'product_mappings': {
+            'total': total,
+            'with_weight': with_weight,
+            'with_size': with_size,
+            'with_neither': with_neither,
+        },
+        'brand_mappings': {
+            'total': db.session.execute(db.select(db.func.count()).select_from(BrandMapping)).scalar(),
+        },
+        'known_product_names': {
+            'total': db.session.execute(db.select(db.func.count()).select_from(KnownProductName)).scalar(),
+        },
+        'reports': {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+        },
+    }
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """
+    Dashboard statistics for the products manager page in one request.
+    Cached per worker and recomputed only when a table's change counter moves.
+    """
+    versions = get_table_versions()
+
+    def build():
+        if _stats_cache['versions'] != versions:
+            _stats_cache['stats'] = compute_stats()
+            _stats_cache['versions'] = versions
+        return jsonify(_stats_cache['stats']), 200
+
+    return conditional_json(list(versions), build, versions)
+
 # ===== Product Mapping API Endpoints =====
 
 @app.route('/api/product-mappings', methods=['GET'])
@@ -172,39 +886,26 @@ def get_product_mappings():
     - search: Search by product name
     - page: Page number (default: 1)
     - per_page: Items per page (default: 50)
+    - cursor: Keyset pagination instead of pages (empty for the first page, then next_cursor)
+    - total: With cursor, include 'exact' or 'estimate' total count
     """
-    search = request.args.get('search', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-
-    query = ProductMapping.query
-
-    if search:
-        query = query.filter(ProductMapping.product_name.contains(search))
-
-    query = query.order_by(ProductMapping.product_name)
-
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    }), 200
+    return conditional_json(['product_mapping'], lambda: list_mappings(
+        ProductMapping, 'product_name', ['product_name'], default_per_page=50))
 
 @app.route('/api/product-mappings/<int:mapping_id>', methods=['GET'])
 def get_product_mapping(mapping_id):
     """
     Get a specific product mapping by ID.
     """
-    mapping = ProductMapping.query.get(mapping_id)
+    def build():
+        mapping = ProductMapping.query.get(mapping_id)
 
-    if not mapping:
-        return jsonify({"error": "Product mapping not found"}), 404
+        if not mapping:
+            return jsonify({"error": "Product mapping not found"}), 404
+
+        return jsonify(mapping.to_dict()), 200
 
-    return jsonify(mapping.to_dict()), 200
+    return conditional_json(['product_mapping'], build)
 
 @app.route('/api/product-mappings', methods=['POST'])
 def create_product_mapping():
@@ -245,6 +946,62 @@ def create_product_mapping():
         db.session.rollback()
         return jsonify({"error": f"Failed to create product mapping: {str(e)}"}), 500
 
+@app.route('/api/product-mappings/export', methods=['GET'])
+def export_product_mappings():
+    """
+    Export all product mappings as CSV, JSONL or XLSX (?format=...), streamed in chunks.
+    """
+    return export_response('product_mappings')
+
+@app.route('/api/product-mappings/bulk', methods=['POST'])
+def bulk_upsert_product_mappings():
+    """
+    Create or update many product mappings in one transaction.
+    Body: JSON array of {"product_name", "box_weight", "box_size"} objects,
+    or a CSV/XLSX upload in the 'file' field (品名/日文名字, 单件净重(kg), 规格 headers accepted).
+    Returns counts of created, updated and unchanged rows.
+    """
+    return run_bulk_upsert(PRODUCT_COLUMN_ALIASES, clean_product_rows, upsert_product_mappings)
+
+# Upper bound on names per /api/product-mappings/suggest call
+MAX_SUGGEST_BATCH = 5000
+
+@app.route('/api/product-mappings/suggest', methods=['POST'])
+def suggest_product_mappings():
+    """
+    Fuzzy ProductMapping candidates for product names that match no mapping.
+    Body: {"names": [...], "limit": 5, "min_score": 0.3}
+    Returns, per name, up to `limit` candidates scored by character-bigram similarity (0-1).
+    """
+    data = request.get_json(silent=True) or {}
+    names = data.get('names')
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+        return jsonify({"error": "Expected a JSON body with a 'names' list of strings"}), 400
+    if len(names) > MAX_SUGGEST_BATCH:
+        return jsonify({"error": f"At most {MAX_SUGGEST_BATCH} names per request"}), 400
+    try:
+        limit = min(max(int(data.get('limit', 5)), 1), 50)
+        min_score = float(data.get('min_score', 0.3))
+    except (ValueError, TypeError):
+        return jsonify({"error": "limit and min_score must be numbers"}), 400
+
+    snapshot = get_snapshot()
+    index = snapshot.suggestion_index()
+    results = []
+    for name in names:
+        candidates = [
+            {
+                'product_name': candidate,
+                'score': score,
+                'box_weight': snapshot.weight(candidate),
+                'box_size': snapshot.size(candidate),
+            }
+            for candidate, score in index.suggest(name, limit, min_score)
+        ]
+        results.append({'name': name, 'candidates': candidates})
+
+    return jsonify({"results": results, "count": len(results)}), 200
+
 @app.route('/api/product-mappings/<int:mapping_id>', methods=['PUT'])
 def update_product_mapping(mapping_id):
     """
@@ -317,44 +1074,26 @@ def get_brand_mappings():
     - search: Search by brand name or reference name
     - page: Page number (default: 1)
     - per_page: Items per page (default: 50)
+    - cursor: Keyset pagination instead of pages (empty for the first page, then next_cursor)
+    - total: With cursor, include 'exact' or 'estimate' total count
     """
-    search = request.args.get('search', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-
-    query = BrandMapping.query
-
-    if search:
-        query = query.filter(
-            db.or_(
-                BrandMapping.brand_name.contains(search),
-                BrandMapping.reference_name.contains(search)
-            )
-        )
-
-    query = query.order_by(BrandMapping.brand_name)
-
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    }), 200
+    return conditional_json(['brand_mapping'], lambda: list_mappings(
+        BrandMapping, 'brand_name', ['brand_name', 'reference_name'], default_per_page=50))
 
 @app.route('/api/brand-mappings/<int:mapping_id>', methods=['GET'])
 def get_brand_mapping(mapping_id):
     """
     Get a specific brand mapping by ID.
     """
-    mapping = BrandMapping.query.get(mapping_id)
+    def build():
+        mapping = BrandMapping.query.get(mapping_id)
 
-    if not mapping:
-        return jsonify({"error": "Brand mapping not found"}), 404
+        if not mapping:
+            return jsonify({"error": "Brand mapping not found"}), 404
+
+        return jsonify(mapping.to_dict()), 200
 
-    return jsonify(mapping.to_dict()), 200
+    return conditional_json(['brand_mapping'], build)
 
 @app.route('/api/brand-mappings', methods=['POST'])
 def create_brand_mapping():
@@ -388,6 +1127,22 @@ def create_brand_mapping():
         db.session.rollback()
         return jsonify({"error": f"Failed to create brand mapping: {str(e)}"}), 500
 
+@app.route('/api/brand-mappings/export', methods=['GET'])
+def export_brand_mappings():
+    """
+    Export all brand mappings as CSV, JSONL or XLSX (?format=...), streamed in chunks.
+    """
+    return export_response('brand_mappings')
+
+@app.route('/api/brand-mappings/bulk', methods=['POST'])
+def bulk_upsert_brand_mappings():
+    """
+    Create or update many brand mappings in one transaction.
+    Body: JSON array of {"brand_name", "reference_name"} objects, or a CSV/XLSX upload in the 'file' field.
+    Returns counts of created, updated and unchanged rows.
+    """
+    return run_bulk_upsert(BRAND_COLUMN_ALIASES, clean_brand_rows, upsert_brand_mappings)
+
 @app.route('/api/brand-mappings/<int:mapping_id>', methods=['PUT'])
 def update_brand_mapping(mapping_id):
     """
@@ -452,39 +1207,26 @@ def get_known_product_names():
     - search: Search by product name
     - page: Page number (default: 1)
     - per_page: Items per page (default: 100)
+    - cursor: Keyset pagination instead of pages (empty for the first page, then next_cursor)
+    - total: With cursor, include 'exact' or 'estimate' total count
     """
-    search = request.args.get('search', '').strip()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 100, type=int)
-
-    query = KnownProductName.query
-
-    if search:
-        query = query.filter(KnownProductName.product_name.contains(search))
-
-    query = query.order_by(KnownProductName.product_name)
-
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    return jsonify({
-        'items': [item.to_dict() for item in pagination.items],
-        'total': pagination.total,
-        'page': page,
-        'per_page': per_page,
-        'pages': pagination.pages
-    }), 200
+    return conditional_json(['known_product_names'], lambda: list_mappings(
+        KnownProductName, 'product_name', ['product_name'], default_per_page=100))
 
 @app.route('/api/known-product-names/<int:name_id>', methods=['GET'])
 def get_known_product_name(name_id):
     """
     Get a specific known product name by ID.
     """
-    name = KnownProductName.query.get(name_id)
+    def build():
+        name = KnownProductName.query.get(name_id)
 
-    if not name:
-        return jsonify({"error": "Known product name not found"}), 404
+        if not name:
+            return jsonify({"error": "Known product name not found"}), 404
+
+        return jsonify(name.to_dict()), 200
 
-    return jsonify(name.to_dict()), 200
+    return conditional_json(['known_product_names'], build)
 
 @app.route('/api/known-product-names', methods=['POST'])
 def create_known_product_name():
@@ -514,6 +1256,22 @@ def create_known_product_name():
         db.session.rollback()
         return jsonify({"error": f"Failed to create known product name: {str(e)}"}), 500
 
+@app.route('/api/known-product-names/export', methods=['GET'])
+def export_known_product_names():
+    """
+    Export all known product names as CSV, JSONL or XLSX (?format=...), streamed in chunks.
+    """
+    return export_response('known_product_names')
+
+@app.route('/api/known-product-names/bulk', methods=['POST'])
+def bulk_upsert_known_product_names():
+    """
+    Add many known product names in one transaction.
+    Body: JSON array of names (strings or {"product_name": ...}), or a CSV/XLSX upload in the 'file' field.
+    Returns counts of created and unchanged names.
+    """
+    return run_bulk_upsert(KNOWN_NAME_COLUMN_ALIASES, clean_known_name_rows, upsert_known_names)
+
 @app.route('/api/known-product-names/<int:name_id>', methods=['PUT'])
 def update_known_product_name(name_id):
     """
@@ -8,7 +8,24 @@ const progressBarContainer = document.getElementById('progressBarContainer');
 const progressBar = document.getElementById('progressBar');
 const downloadLinkArea = document.getElementById('downloadLinkArea');
 const downloadButton = document.getElementById('downloadButton');
+const includeSuggestions = document.getElementById('includeSuggestions');
+const previewArea = document.getElementById('previewArea');
+const previewSummary = document.getElementById('previewSummary');
+const previewTable = document.getElementById('previewTable');
+const previewPrev = document.getElementById('previewPrev');
+const previewNext = document.getElementById('previewNext');
+const previewPageInfo = document.getElementById('previewPageInfo');
+const PREVIEW_ROWS = 20;
+const STAGE_LABELS = {
+    queued: '排队中 Queued',
+    parsing: '读取文件 Parsing',
+    matching: '匹配品名 Matching',
+    aggregating: '汇总 Aggregating',
+    writing: '写入报表 Writing',
+};
 let selectedFiles = [];
+let previewReportId = null;
+let previewPage = 1;
 // --- INITIALIZATION AND EVENT LISTENERS ---
 document.addEventListener('DOMContentLoaded', () => {
     // 1. Link file input to drop area click
@@ -28,6 +45,9 @@ document.addEventListener('DOMContentLoaded', () => {
         if (dt)
             handleFiles(dt.files);
     }, false);
+    // 5. Preview paging
+    previewPrev.addEventListener('click', () => loadPreview(previewPage - 1));
+    previewNext.addEventListener('click', () => loadPreview(previewPage + 1));
 });
 function preventDefaults(e) {
     e.preventDefault();
@@ -74,6 +94,7 @@ async function handleReportGeneration() {
     // 1. START PROCESSING (UI State)
     setProcessingState('Step 1/2: Uploading files...', true, 10);
     downloadLinkArea.classList.add('hidden');
+    previewArea.classList.add('hidden');
     let uploadedFilePaths = [];
     // --- STEP 1: UPLOAD FILES ---
     try {
@@ -101,16 +122,21 @@ async function handleReportGeneration() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 file_paths: uploadedFilePaths,
-                params: { date_range: dateRange }
+                params: { date_range: dateRange, include_suggestions: includeSuggestions.checked },
+                // Return at once and follow the progress stream instead of waiting on the request
+                async: true
             })
         });
         if (!generateResponse.ok)
             throw new Error(`Generation failed (${generateResponse.status})`);
-        const reportData = await generateResponse.json();
+        const started = await generateResponse.json();
+        const reportData = await followProgress(started.progress_url);
         // 3. SUCCESS (UI State)
         setProcessingState(`✅ Report complete! ${reportData.report_id}`, false, 100);
-        downloadButton.href = reportData.download_url;
+        downloadButton.href = reportData.download_url ?? `/api/report/download/${reportData.report_id}`;
         downloadLinkArea.classList.remove('hidden');
+        previewReportId = reportData.report_id;
+        loadPreview(1);
     }
     catch (error) {
         setProcessingState(`Error: Report generation failed. ${error instanceof Error ? error.message : ''}`, false, 0);
@@ -122,4 +148,86 @@ async function handleReportGeneration() {
         generateButton.disabled = true;
     }
 }
+// --- REPORT PROGRESS ---
+// Resolves with the 'done' event of a report's progress stream, rejects with its 'error' event
+function followProgress(progressUrl) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(progressUrl);
+        source.addEventListener('progress', (e) => {
+            renderProgress(JSON.parse(e.data));
+        });
+        source.addEventListener('done', (e) => {
+            source.close();
+            resolve(JSON.parse(e.data));
+        });
+        source.addEventListener('error', (e) => {
+            const data = e.data;
+            if (data) {
+                source.close();
+                reject(new Error(JSON.parse(data).message));
+            }
+            else if (source.readyState === EventSource.CLOSED) {
+                // Connection errors have no data; EventSource reconnects unless the request failed outright
+                reject(new Error('Progress stream unavailable'));
+            }
+        });
+    });
+}
+function renderProgress(event) {
+    let message = `Step 2/2: ${STAGE_LABELS[event.stage] ?? event.stage}`;
+    if (event.file && event.files)
+        message += ` ${event.file}/${event.files} (${event.filename})`;
+    if (event.rows !== undefined)
+        message += ` · ${event.rows.toLocaleString()} rows`;
+    if (event.eta !== undefined && event.eta !== null)
+        message += ` · ETA ${formatSeconds(event.eta)}`;
+    // Generation fills the second half of the bar, after the upload
+    setProcessingState(message, true, 50 + Math.round((event.percent ?? 0) / 2));
+}
+function formatSeconds(seconds) {
+    const total = Math.round(seconds);
+    return total < 60 ? `${total}s` : `${Math.floor(total / 60)}m ${total % 60}s`;
+}
+// --- REPORT PREVIEW ---
+async function loadPreview(page) {
+    if (!previewReportId)
+        return;
+    try {
+        const response = await fetch(`/api/report/${previewReportId}/preview?page=${page}&per_page=${PREVIEW_ROWS}`);
+        if (!response.ok)
+            return; // No preview cached: the download link is still there
+        const preview = await response.json();
+        previewPage = preview.page;
+        renderPreview(preview);
+        previewArea.classList.remove('hidden');
+    }
+    catch (error) {
+        console.error('Preview failed', error);
+    }
+}
+function renderPreview(preview) {
+    const summary = preview.summary;
+    previewSummary.textContent = summary
+        ? `${summary.groups} 行 rows · 数量 ${summary.quantity.toLocaleString()} · 总价格 ${summary.total_price.toLocaleString()}` +
+            ` · 净重 ${summary.net_weight.toLocaleString()} kg · 无重量/尺寸 without weight/size: ` +
+            `${summary.unmatched.names} 品名 (${summary.unmatched.groups} rows)`
+        : '无数据 No data.';
+    previewTable.innerHTML = '';
+    const header = previewTable.createTHead().insertRow();
+    preview.columns.forEach(column => {
+        const th = document.createElement('th');
+        th.textContent = column;
+        header.appendChild(th);
+    });
+    const body = previewTable.createTBody();
+    preview.rows.forEach(row => {
+        const tr = body.insertRow();
+        row.forEach(value => {
+            tr.insertCell().textContent = value === null ? '' : String(value);
+        });
+    });
+    previewPageInfo.textContent = `${preview.page} / ${Math.max(preview.pages, 1)}`;
+    previewPrev.disabled = preview.page <= 1;
+    previewNext.disabled = preview.page >= preview.pages;
+}
 export {};
@@ -13,4 +13,53 @@ export interface ReportGenerationResponse {
     download_url: string;
 }
 
+// Define the API response structure for asynchronous report generation (202)
+export interface AsyncReportResponse {
+    report_id: string;
+    status: string;
+    progress_url: string;
+    message: string;
+}
+
+// Payload of a report progress stream event (progress, done or error)
+export interface ReportProgressEvent {
+    report_id: string;
+    stage: string; // queued, parsing, matching, aggregating, writing, done, error
+    status: string;
+    file?: number;
+    files?: number;
+    filename?: string;
+    rows?: number;
+    elapsed?: number;
+    percent?: number;
+    eta?: number | null; // seconds
+    download_url?: string;
+    message?: string;
+}
+
+// Totals and unmatched-product counts of a report summary
+export interface ReportPreviewSummary {
+    groups: number;
+    quantity: number;
+    total_price: number;
+    net_weight: number;
+    unmatched: {
+        names: number;
+        groups: number;
+        quantity: number;
+    };
+}
+
+// Define the API response structure for a report preview page
+export interface ReportPreviewResponse {
+    report_id: string;
+    columns: string[];
+    rows: (string | number | null)[][];
+    summary: ReportPreviewSummary | null;
+    page: number;
+    per_page: number;
+    total: number;
+    pages: number;
+}
+
 // Any other core data models go here...
\ No newline at end of file
@@ -6,6 +6,7 @@ BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 # File Storage & Management
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 REPORT_FOLDER = os.path.join(BASE_DIR, 'reports')
+CACHE_FOLDER = os.path.join(BASE_DIR, 'cache')  # Derived data that can be rebuilt at any time
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'} # Excel formats
 
 # Database Configuration
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+ProductMapping coverage analysis for manufacturer Excel files.
+
+Measures how many distinct 品名 in the uploaded files end up with
+weight/size data after name matching, using the production matching engine
+(MappingSnapshot: normalized-key lookup, then substring matcher).
+
+Workbooks are parsed in a process pool and only for their 品名 column. The
+per-file name counts are cached on disk, keyed by path, size and mtime, so
+re-running after a mapping edit only re-matches names and re-reads nothing.
+
+Usage:
+    python coverage_analyzer.py [--uploads uploads] [--workers N] [--no-cache] [--json report.json]
+    python coverage_analyzer.py --json -     # JSON to stdout
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import config
+
+# Bump when the cached per-file payload changes shape
+PARSE_CACHE_VERSION = 1
+COVERAGE_CACHE_FOLDER = os.path.join(config.CACHE_FOLDER, 'coverage')
+
+NAME_COLUMNS = ['品名', '日文名字']
+# Upload catalog schemas that carry one of NAME_COLUMNS
+NAME_SCHEMAS = ['manufacturer', 'mapping_source']
+EXAMPLE_COUNT = 10
+TOP_UNMATCHED_COUNT = 20
+
+
+def list_excel_files(uploads_dir):
+    """Workbooks in uploads_dir whose upload catalog schema has a name column. Needs an app context."""
+    from upload_catalog import catalog_paths
+    return catalog_paths(uploads_dir, NAME_SCHEMAS)
+
+
+def read_name_counts(path):
+    """
+    Parse one workbook's 品名 (or 日文名字) column into {name: row count}.
+    Runs in a worker process.
+
+    Returns:
+        dict with rows, name_column and names, or None for files without a name column
+    """
+    from workbook_reader import read_columns
+
+    df, missing = read_columns(path, NAME_COLUMNS)
+    name_column = next((c for c in NAME_COLUMNS if c not in missing), None)
+    if name_column is None:
+        return None
+    names = df[name_column].dropna()
+    return {
+        'rows': int(len(names)),
+        'name_column': name_column,
+        'names': {str(k): int(v) for k, v in names.astype(str).value_counts(sort=False).items()},
+    }
+
+
+def _cache_path(path):
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(COVERAGE_CACHE_FOLDER, f'{digest}.json')
+
+
+def _cache_key(path):
+    stat = os.stat(path)
+    return [PARSE_CACHE_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def load_cached(path):
+    try:
+        with open(_cache_path(path), encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == _cache_key(path):
+            return cached
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def store_cached(path, parsed):
+    os.makedirs(COVERAGE_CACHE_FOLDER, exist_ok=True)
+    payload = {'key': _cache_key(path), 'parsed': parsed}
+    tmp_path = _cache_path(path) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, _cache_path(path))
+
+
+def parse_files(paths, workers=None, use_cache=True):
+    """
+    Return {path: (parsed or None, error or None, from_cache)}.
+    Cache misses are parsed in parallel.
+    """
+    results = {}
+    to_parse = []
+    for path in paths:
+        cached = load_cached(path) if use_cache else None
+        if cached is not None:
+            results[path] = (cached['parsed'], None, True)
+        else:
+            to_parse.append(path)
+
+    if to_parse:
+        workers = workers or min(len(to_parse), os.cpu_count() or 1)
+        if workers <= 1:
+            outcomes = []
+            for path in to_parse:
+                try:
+                    outcomes.append((path, read_name_counts(path), None))
+                except Exception as e:
+                    outcomes.append((path, None, str(e)))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(path, pool.submit(read_name_counts, path)) for path in to_parse]
+                outcomes = []
+                for path, future in futures:
+                    try:
+                        outcomes.append((path, future.result(), None))
+                    except Exception as e:
+                        outcomes.append((path, None, str(e)))
+
+        for path, parsed, error in outcomes:
+            if error is None and use_cache:
+                store_cached(path, parsed)
+            results[path] = (parsed, error, False)
+
+    return results
+
+
+def _percent(part, whole):
+    return round(part / whole * 100, 1) if whole else 0.0
+
+
+def analyze_coverage(file_paths, snapshot, workers=None, use_cache=True):
+    """
+    Compute ProductMapping coverage for the given workbooks.
+
+    Every distinct raw name across all files is matched once. Coverage is
+    the share of distinct names after matching that have a ProductMapping
+    entry, as in the original analysis; row-weighted coverage is reported
+    alongside.
+
+    Returns:
+        JSON-serializable dict
+    """
+    started = time.perf_counter()
+    parsed_files = parse_files(file_paths, workers=workers, use_cache=use_cache)
+
+    all_names = set()
+    for parsed, _, _ in parsed_files.values():
+        if parsed:
+            all_names.update(parsed['names'])
+
+    mapped = snapshot.product_mappings
+    resolved = {name: snapshot.match(name) for name in all_names}
+    canonical = {name: (m if m is not None else name) for name, (m, _) in resolved.items()}
+    match_types = Counter(t or 'none' for _, t in resolved.values())
+
+    files, skipped = [], []
+    totals = Counter()
+    unmatched_rows = Counter()
+
+    for path in file_paths:
+        parsed, error, from_cache = parsed_files[path]
+        if error is not None:
+            skipped.append({'file': os.path.basename(path), 'reason': error})
+            continue
+        if parsed is None:
+            skipped.append({'file': os.path.basename(path), 'reason': 'no 品名 or 日文名字 column'})
+            continue
+
+        names = parsed['names']
+        matched_rows = Counter()
+        for name, count in names.items():
+            matched_rows[canonical[name]] += count
+        with_data = [n for n in matched_rows if n in mapped]
+        rows_with_data = sum(matched_rows[n] for n in with_data)
+        raw_with_data = sum(1 for n in names if n in mapped)
+
+        for name, count in matched_rows.items():
+            if name not in mapped:
+                unmatched_rows[name] += count
+
+        entry = {
+            'file': os.path.basename(path),
+            'name_column': parsed['name_column'],
+            'rows': parsed['rows'],
+            'unique_names': len(names),
+            'raw_with_data': raw_with_data,
+            'raw_coverage': _percent(raw_with_data, len(names)),
+            'unique_after_matching': len(matched_rows),
+            'with_data': len(with_data),
+            'coverage': _percent(len(with_data), len(matched_rows)),
+            'row_coverage': _percent(rows_with_data, parsed['rows']),
+            'cached': from_cache,
+        }
+        files.append(entry)
+        totals.update({
+            'rows': entry['rows'],
+            'rows_with_data': rows_with_data,
+            'unique_names': entry['unique_names'],
+            'raw_with_data': raw_with_data,
+            'unique_after_matching': entry['unique_after_matching'],
+            'with_data': entry['with_data'],
+        })
+
+    examples = [
+        {'raw': name, 'canonical': canonical[name], 'match_type': resolved[name][1],
+         'has_data': canonical[name] in mapped}
+        for name in sorted(all_names) if canonical[name] != name
+    ][:EXAMPLE_COUNT]
+
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'mapping_versions': snapshot.versions,
+        'known_names': len(snapshot.known_names),
+        'product_mappings': len(mapped),
+        'files': files,
+        'skipped': skipped,
+        'totals': {
+            'files': len(files),
+            'rows': totals['rows'],
+            'unique_names': totals['unique_names'],
+            'raw_with_data': totals['raw_with_data'],
+            'raw_coverage': _percent(totals['raw_with_data'], totals['unique_names']),
+            'unique_after_matching': totals['unique_after_matching'],
+            'with_data': totals['with_data'],
+            'coverage': _percent(totals['with_data'], totals['unique_after_matching']),
+            'row_coverage': _percent(totals['rows_with_data'], totals['rows']),
+            'distinct_names_all_files': len(all_names),
+        },
+        'match_types': dict(match_types),
+        'examples': examples,
+        'top_unmatched': [{'name': n, 'rows': c} for n, c in unmatched_rows.most_common(TOP_UNMATCHED_COUNT)],
+        'parsed_files': sum(1 for _, _, cached in parsed_files.values() if not cached),
+        'cached_files': sum(1 for _, _, cached in parsed_files.values() if cached),
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def print_summary(result):
+    print("=" * 80)
+    print("COVERAGE ANALYSIS")
+    print("=" * 80)
+    print(f"📚 Known names: {result['known_names']}")
+    print(f"📦 ProductMapping products: {result['product_mappings']}")
+    print(f"📄 Files: {result['totals']['files']} analyzed "
+          f"({result['parsed_files']} parsed, {result['cached_files']} from cache), "
+          f"{len(result['skipped'])} skipped")
+    print()
+
+    for f in result['files']:
+        print(f"📄 {f['file']}")
+        print(f"   Unique products: {f['unique_names']} → {f['unique_after_matching']} after matching")
+        print(f"   With weight/size: {f['with_data']}/{f['unique_after_matching']} ({f['coverage']:.1f}%), "
+              f"before matching {f['raw_coverage']:.1f}%, by rows {f['row_coverage']:.1f}%")
+    for s in result['skipped']:
+        print(f"⚠️  Skipped {s['file']}: {s['reason']}")
+
+    t = result['totals']
+    print()
+    print("=" * 80)
+    print("OVERALL SUMMARY")
+    print("=" * 80)
+    print(f"Total unique products: {t['unique_names']} → {t['unique_after_matching']} after matching")
+    print(f"With weight/size: {t['with_data']}/{t['unique_after_matching']} ({t['coverage']:.1f}%)")
+    print(f"Before matching: {t['raw_with_data']}/{t['unique_names']} ({t['raw_coverage']:.1f}%)")
+    print(f"By rows: {t['row_coverage']:.1f}% of {t['rows']} rows")
+    print(f"Match types: {result['match_types']}")
+
+    if result['top_unmatched']:
+        print()
+        print("❌ Most frequent names without weight/size:")
+        for item in result['top_unmatched']:
+            print(f"   {item['rows']:6d}  {item['name']}")
+
+    print()
+    print(f"⏱️  {result['elapsed_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ProductMapping coverage analysis for uploaded Excel files')
+    parser.add_argument('--uploads', default=config.UPLOAD_FOLDER, help='folder with manufacturer Excel files')
+    parser.add_argument('--workers', type=int, default=None, help='parser processes (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='re-parse every file')
+    parser.add_argument('--json', metavar='PATH', help="write the JSON result to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    from app import app
+    from name_matcher import get_snapshot
+
+    with app.app_context():
+        files = list_excel_files(args.uploads)
+        if not files:
+            print(f"⚠️  No Excel files found in {args.uploads}", file=sys.stderr)
+            sys.exit(1)
+        result = analyze_coverage(files, get_snapshot(), workers=args.workers, use_cache=not args.no_cache)
+
+    if args.json == '-':
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"💾 JSON written to {args.json}")
+    print_summary(result)
+
+
+if __name__ == '__main__':
+    main()
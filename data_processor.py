@@ -2,18 +2,14 @@
 import pandas as pd
 import os
 import numpy as np
-import re
 import random
-from database import BrandMapping, KnownProductName, ProductMapping
-
-def load_product_mappings_from_db():
-    """Load product weight/size mappings from database"""
-    try:
-        mappings = ProductMapping.query.all()
-        return {m.product_name: {'weight': m.box_weight, 'size': m.box_size} for m in mappings}
-    except Exception as e:
-        print(f"Warning: Could not load product mappings from database: {e}")
-        return {}
+from collections import Counter
+from itertools import accumulate
+# Re-exported: older scripts import the loaders from data_processor
+from name_matcher import (
+    get_snapshot, canonical_names_memoized,
+    load_product_mappings_from_db, load_brand_mappings_from_db, load_known_names_from_db
+)
 
 # DEPRECATED: No longer auto-updating from Excel files
 # All weight/size data now comes exclusively from ProductMapping table
@@ -29,95 +25,82 @@ def load_product_mappings_from_db():
 #     """
 #     ...
 
-def load_brand_mappings_from_db():
-    """Load brand mappings from database"""
-    try:
-        mappings = BrandMapping.query.all()
-        return {m.brand_name: m.reference_name for m in mappings}
-    except Exception as e:
-        print(f"Warning: Could not load brand mappings from database: {e}")
-        # Fallback to hardcoded values if database is not available
-        return {
-            '072LABO': '072LABO',
-            'AO': 'A-one',
-            "AVS Collector's": "AVS Collector's",
-            'FANTASTICBABY': 'FANTASTICBABY',
-            'HP': 'Hotpowers',
-            'ME': 'MagicEyes',
-            'PT': 'Peach Toys',
-            'RJ': 'Ride Japan',
-            'TH': 'Toys Heart',
-            'TMT': 'Tamatoys',
-            'アリスJAPAN': '爱丽丝',
-            'キテルキテル': 'Kiteru Kiteru',
-            'ハトプラ': 'EXE',
-            'ハトプラ(EXE)': 'EXE',
-            'ハトプラ(GPRO)': 'EXE',
-            'ハトプラ(HATOPLA)': 'EXE',
-            'ハトプラ(PPP)': 'EXE',
-        }
-
-def load_known_names_from_db():
-    """Load known product names from database"""
-    try:
-        names = KnownProductName.query.all()
-        return [n.product_name for n in names]
-    except Exception as e:
-        print(f"Warning: Could not load known names from database: {e}")
-        # Fallback to hardcoded values if database is not available
-        return [
-            '体位DX',
-            '赤貝乳豆スクラブ',
-            'オナホ屋さんのだ液汁',
-            '胡夢',
-            '有坂深雪',
-            'ポンコツガーディアンユニバース ユニコーンプレミアム肉厚ファビュラス',
-            '幼馴染',
-            'PUNIVIRGIN[ぷにばーじん]1000 ふわとろ',
-            'Chu！［チュッ！］',
-            'JAPANESE REAL HOLE',
-            'ぷにあなSPDX ',
-            'ぷにあなミラクル爆乳DX',
-            '網',
-            'けもろーしょん',
-            '対魔忍',
-            'ZARA GYUGYU',
-            'すじまん くぱぁ ココロ',
-            '極彩ウテルス ',
-            'オナシー',
-            'ろりんこ創世記ナマイキHARD',
-            '疑似ちつ ツブびら淫スパイラル　すけすけ',
-            '激フェラ',
-            'まる剥がしリアル 八乃つばさ',
-            'フェラ お口でちゅくします',
-            '名器覚醒',
-            '素人リアル',
-            '名器の証明',
-            '地雷系女子パンキーメッシュ',
-            'ポロンコロン',
-            '欲情',
-            '処女くぱぁ',
-            'おなつゆ(onatsuyu)370ml',
-            "あほすたさん印の母乳ローション(Fake mother's milk Lubricant)",
-            '現役JD',
-            '匂い',
-            'プルルンおっぱいニプルファック',
-            '千鶴',
-            '制服美少女',
-            '先輩',
-            '爆乳',
-            '三芳の愛液',
-            '360 FETISH 潮SPLASH',
-            'チクニー＆チクパコ',
-            'ONA砲',
-            'オナホルダー',
-            'AVミニ名器',
-            '真実の口',
-            'あこがれの美少女ブルマ',
-            '名器創生',
-            '素人リアル',
-            '日本のローション',
-        ]
+# Group keys of the board summary
+SUMMARY_KEYS = ['品牌', '品名', '价格区间', '分類', '産地']
+
+# Price band thresholds (bins)
+# Note: The first bin must be lower than your minimum price, and the last must be higher than your maximum price.
+# Use -np.inf and np.inf to catch all possible values.
+PRICE_BINS = [
+    -np.inf, # Lowest possible number
+    500,     # Upper bound for the first category
+    1000,    # Upper bound for the second category
+    2500,    # Upper bound for the third category
+    5000,    # Upper bound for the 4th category
+    10000,    # Upper bound for the 5th category
+    20000,    # Upper bound for the 6th category
+    30000,    # Upper bound for the 7th category
+    np.inf   # Highest possible number
+]
+# Corresponding price band labels (must have one less label than bins)
+PRICE_LABELS = [
+    'less_than_500', 
+    '500_to_1000', 
+    '1000_to_2500', 
+    '2500_to_5000',
+    '5000_to_10000', 
+    '10000_to_20000', 
+    '20000_to_30000', 
+    'over_30000'
+]
+
+# Rows per chunk in streaming mode
+STREAM_CHUNK_ROWS = 5000
+
+# Business columns a row fingerprint is computed from: every raw group key
+# (价格区间 derives from Price) plus 型番 and the amounts, so rows that
+# differ in anything the board summary uses never fingerprint alike. A row
+# whose fingerprint already appeared in an earlier file is a cross-file duplicate
+DEDUP_COLUMNS = ['品牌', '品名', '分類', '産地', '型番', 'Pcs', 'Price', 'Total']
+NUMERIC_DEDUP_COLUMNS = {'Pcs', 'Price', 'Total'}
+# mapping_config['dedup']: drop duplicates, only count them (flag), or skip the check
+DEDUP_MODES = ('drop', 'flag', 'off')
+# Duplicates are only counted unless a report asks for 'drop'
+DEFAULT_DEDUP_MODE = 'flag'
+
+def ignore_progress(stage, **info):
+    """Default for mapping_config['progress']: report nothing."""
+
+def byte_offsets(paths):
+    """Bytes before each file and in total ([0, s1, s1+s2, ...]), for progress estimates."""
+    sizes = [os.path.getsize(p) if os.path.isfile(p) else 0 for p in paths]
+    return [0, *accumulate(sizes)]
+
+def clean_manufacturer_frame(df):
+    """Standardize one manufacturer workbook's columns and types before matching."""
+    # Standardize column names from source Excel files
+    # Map '日文名字' to '品名' if it exists
+    if '日文名字' in df.columns and '品名' not in df.columns:
+        df = df.rename(columns={'日文名字': '品名'})
+
+    # Drop rows with missing critical data
+    df = df.dropna(subset=['品牌', '品名'])
+
+    # Ensure data types are correct
+    return df.assign(
+        Pcs=pd.to_numeric(df['Pcs'], errors='coerce'),
+        Price=pd.to_numeric(df['Price'], errors='coerce'),
+    )
+
+def price_band(prices):
+    """Bucket prices into the PRICE_LABELS categories."""
+    return pd.cut(
+        prices,
+        bins=PRICE_BINS,
+        labels=PRICE_LABELS,
+        right=True, # Intervals are (a, b] - means 500 goes into the '500_to_1000' category
+        include_lowest=True # Ensures the lowest value in the data is captured
+    )
 
 def join_unique_strings(series):
     """
@@ -135,32 +118,399 @@ def join_unique_strings(series):
     # 4. Join them with a delimiter (e.g., comma and space)
     return ', '.join(unique_values)
 
+def broadcast(values_by_code, codes):
+    """Expand per-distinct-value results back to one value per row using pd.factorize codes."""
+    return values_by_code.to_numpy()[codes]
+
+def unmatched_suggestions(snapshot, unmatched):
+    """
+    One row per fuzzy ProductMapping candidate for each unmatched 品名
+    (a single blank-candidate row when there is none).
+
+    Args:
+        unmatched: Series of row counts indexed by 品名
+    """
+    index = snapshot.suggestion_index()
+    records = []
+    for name, row_count in unmatched.items():
+        candidates = index.suggest(name)
+        if not candidates:
+            records.append({'品名': name, '行数': row_count, '候选品名': None, '相似度': None,
+                            '单件净重(kg)': None, '规格': None})
+        for candidate, score in candidates:
+            records.append({'品名': name, '行数': row_count, '候选品名': candidate, '相似度': score,
+                            '单件净重(kg)': snapshot.weight(candidate), '规格': snapshot.size(candidate)})
+    return pd.DataFrame(records, columns=['品名', '行数', '候选品名', '相似度', '单件净重(kg)', '规格'])
+
+def finalize_summary(summary_df):
+    """
+    Derive 净重/毛重/报关 for aggregated groups. Expects the group keys plus
+    型号, 数量, 总价格, 单件净重(kg), 规格 and the summed 净重.
+    """
+    # Replace 净重 with None if value is 0 (means no weight data available)
+    summary_df['净重'] = summary_df['净重'].apply(lambda x: None if x == 0 else x)
+
+    summary_df['毛重'] = summary_df['净重'] * random.uniform(1.08, 1.12)
+
+    # Build 报关 column with model information
+    summary_df['报关'] = np.where(
+        (summary_df['型号'].isna()) | (summary_df['型号'] == ''),
+        '型号：无型号',
+        '型号：' + summary_df['型号'].astype(str)
+    )
+
+    # Add prefix for ADULT TOY category
+    adult_toy_prefix = '成人用品 成人解决生理需求用|热塑性弹性体TPE制 '
+    summary_df['报关'] = np.where(
+        (summary_df['分類'] == 'ADULT TOY') | (summary_df['分類'] == 'ELECTRIC ADULT TOY') | (summary_df['分類'] == 'CLOTHING'),
+        adult_toy_prefix + summary_df['报关'],
+        summary_df['报关']
+    )
+
+    # add prefix for lotion category
+    lotion_prefix = '润滑液人体润滑用|水90%，甘油5%，聚丙烯酸钠5%|不含从石油或沥青提取矿物油类 '
+    summary_df['报关'] = np.where(
+        summary_df['分類'] == 'LOTION',
+        lotion_prefix + summary_df['报关'],
+        summary_df['报关']
+    )
+
+    return summary_df
+
+def row_fingerprints(df):
+    """
+    64-bit hash of each row's DEDUP_COLUMNS, vectorized. Numeric columns are
+    coerced first so 100 and 100.0 hash alike; missing columns hash as blank.
+    """
+    key = pd.DataFrame(index=df.index)
+    for column in DEDUP_COLUMNS:
+        if column not in df.columns:
+            values = pd.Series(np.nan if column in NUMERIC_DEDUP_COLUMNS else None, index=df.index, dtype=object)
+        elif column in NUMERIC_DEDUP_COLUMNS:
+            values = pd.to_numeric(df[column], errors='coerce')
+        else:
+            values = df[column]
+        if column in NUMERIC_DEDUP_COLUMNS:
+            key[column] = values.astype(float)
+        else:
+            key[column] = values.astype(object).where(values.notna(), None)
+    return pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+def dedup_stats(mode, file_stats):
+    """Dedup summary for Report.dedup_stats from [(filename, rows, duplicate rows)]."""
+    return {
+        'mode': mode,
+        'rows': sum(rows for _, rows, _ in file_stats),
+        'duplicate_rows': sum(duplicates for _, _, duplicates in file_stats),
+        'files': [{'file': name, 'rows': rows, 'duplicate_rows': duplicates}
+                  for name, rows, duplicates in file_stats],
+    }
+
+def drop_cross_file_duplicates(master_df, file_ids, file_names, mode=DEFAULT_DEDUP_MODE):
+    """
+    Find rows repeating a row of an earlier file (same fingerprint), e.g. an
+    overlapping re-send or the same week uploaded under another name.
+    Repeats within one file are kept: those are separate order lines.
+
+    Args:
+        file_ids: index into file_names of each row's source file
+        mode: 'drop' removes the duplicates, 'flag' only counts them
+
+    Returns:
+        (DataFrame, dedup_stats dict)
+    """
+    if len(file_names) > 1:
+        fingerprints = row_fingerprints(master_df)
+        first_file = pd.Series(file_ids).groupby(fingerprints).transform('min').to_numpy()
+        duplicate = file_ids != first_file
+    else:
+        duplicate = np.zeros(len(master_df), dtype=bool)
+
+    rows = np.bincount(file_ids, minlength=len(file_names))
+    duplicates = np.bincount(file_ids[duplicate], minlength=len(file_names))
+    stats = dedup_stats(mode, [
+        (os.path.basename(name), int(r), int(d)) for name, r, d in zip(file_names, rows, duplicates)
+    ])
+    if stats['duplicate_rows']:
+        action = 'dropped' if mode == 'drop' else 'kept (flag mode)'
+        print(f"🧬 {stats['duplicate_rows']} of {stats['rows']} rows repeat rows of earlier files, {action}")
+    if mode == 'drop' and duplicate.any():
+        master_df = master_df[~duplicate].reset_index(drop=True)
+    return master_df, stats
+
+class CrossFileDedup:
+    """
+    drop_cross_file_duplicates() for the streaming path: fingerprints of the
+    rows of completed files are kept in one sorted uint64 array, and each
+    chunk is checked against them.
+    """
+
+    def __init__(self, mode=DEFAULT_DEDUP_MODE):
+        self.mode = mode
+        self.seen = np.empty(0, dtype=np.uint64)
+        self.file_stats = []
+        self._start_file()
+
+    def _start_file(self):
+        self._fingerprints = []
+        self._rows = 0
+        self._duplicates = 0
+
+    def filter(self, chunk):
+        """Return the chunk without rows already seen in earlier files (unchanged in flag mode)."""
+        fingerprints = row_fingerprints(chunk)
+        duplicate = np.isin(fingerprints, self.seen)
+        self._fingerprints.append(fingerprints)
+        self._rows += len(chunk)
+        self._duplicates += int(duplicate.sum())
+        if self.mode == 'drop' and duplicate.any():
+            return chunk[~duplicate]
+        return chunk
+
+    def end_file(self, path, completed=True):
+        """Add a finished file's fingerprints; a failed file contributes nothing."""
+        if completed:
+            if self._fingerprints:
+                self.seen = np.union1d(self.seen, np.concatenate(self._fingerprints))
+            self.file_stats.append((os.path.basename(path), self._rows, self._duplicates))
+        self._start_file()
+
+    def stats(self):
+        stats = dedup_stats(self.mode, self.file_stats)
+        if stats['duplicate_rows']:
+            action = 'dropped' if self.mode == 'drop' else 'kept (flag mode)'
+            print(f"🧬 {stats['duplicate_rows']} of {stats['rows']} rows repeat rows of earlier files, {action}")
+        return stats
+
+class MemoryReport:
+    """Deep memory usage of the working DataFrame after each pipeline stage."""
+
+    def __init__(self, enabled):
+        self.enabled = bool(enabled)
+        self.stages = []
+
+    def record(self, stage, df):
+        if not self.enabled:
+            return
+        size = int(df.memory_usage(deep=True).sum())
+        self.stages.append({'stage': stage, 'rows': len(df), 'bytes': size})
+        print(f'🧠 {stage:<10} {len(df):>9} rows  {size / 1024 / 1024:9.2f} MB')
+
+    def attach(self, summary_df):
+        if self.enabled:
+            summary_df.attrs['memory_report'] = self.stages
+
+def categorical_from_results(results, codes):
+    """
+    Categorical column from per-distinct-value results and pd.factorize codes.
+    Results may repeat (several raw names → one canonical name), so they are
+    factorized again to get unique categories.
+    """
+    result_codes, categories = pd.factorize(pd.Series(results, dtype=object))
+    return pd.Categorical.from_codes(result_codes[codes], categories=categories)
+
+def narrow_numeric(series):
+    """Smallest integer dtype when every value is a whole number, else float64."""
+    numbers = pd.to_numeric(series, errors='coerce')
+    if numbers.notna().all() and (numbers % 1 == 0).all():
+        return pd.to_numeric(numbers, downcast='integer')
+    return numbers.astype('float64')
+
+def aggregate_compact(master_df, snapshot, memory, arrow_strings=False, count_unmatched=False,
+                      progress=ignore_progress):
+    """
+    In-memory aggregation on a compact representation.
+
+    Group keys become categoricals, so the five-key groupby runs on integer
+    codes; Pcs/Total are narrowed to the smallest integer dtype when whole;
+    Price is only kept as its price band (prices are banded at full
+    precision, then dropped). Weight and size depend on 品名 alone, so they
+    are looked up per summary group instead of per row. Amounts that reach
+    the report (weights, 总价格 with decimals) stay float64 so figures
+    match the default path exactly.
+
+    Returns:
+        (summary DataFrame before finalize_summary, unmatched name counts or None)
+    """
+    df = pd.DataFrame({
+        '分類': master_df['分類'].astype('category'),
+        '産地': master_df['産地'].astype('category'),
+        'Pcs': narrow_numeric(master_df['Pcs']),
+        'Total': narrow_numeric(master_df['Total']),
+        '价格区间': price_band(master_df['Price']),
+    })
+    model = master_df['型番']
+    if arrow_strings:
+        try:
+            import pyarrow  # noqa: F401  (optional dependency)
+            df['型番'] = model.astype('string[pyarrow]')
+        except ImportError:
+            print('Warning: pyarrow is not installed, keeping 型番 as categorical')
+            df['型番'] = model.astype(str).where(model.notna()).astype('category')
+    else:
+        df['型番'] = model.astype(str).where(model.notna()).astype('category')
+
+    # Match each distinct name once and store the result as categorical codes
+    name_codes, raw_names = pd.factorize(master_df['品名'])
+    canonical_list, memo_hits = canonical_names_memoized(snapshot, raw_names)
+    df['品名'] = categorical_from_results(canonical_list, name_codes)
+    print(f'🔎 Matched {len(raw_names)} distinct names for {len(df)} rows ({memo_hits} from memo)')
+
+    brand_codes, raw_brands = pd.factorize(master_df['品牌'])
+    df['品牌'] = categorical_from_results([snapshot.reference_brand(b) for b in raw_brands], brand_codes)
+
+    # 净重 = 单件净重(kg) * Pcs, with the weight looked up per category
+    weights = np.array([snapshot.weight(n) for n in df['品名'].cat.categories], dtype='float64')
+    df['净重'] = weights[df['品名'].cat.codes.to_numpy()] * df['Pcs']
+    memory.record('compacted', df)
+
+    unmatched = None
+    if count_unmatched:
+        counts = df['品名'].value_counts()
+        unmatched = counts[(counts > 0) & ~counts.index.isin(list(snapshot.product_mappings))]
+
+    progress('aggregating', rows=len(df))
+    grouped = df.groupby(SUMMARY_KEYS, observed=True)
+    summary_df = grouped.agg(
+        数量=('Pcs', 'sum'),
+        总价格=('Total', 'sum'),
+        净重=('净重', 'sum'),
+    )
+
+    # 型号: distinct 型番 per group in first-seen order, joined without a per-group lambda
+    models = df.loc[df['型番'].notna(), SUMMARY_KEYS + ['型番']].drop_duplicates()
+    models = models.assign(型番=models['型番'].astype(str))
+    joined = models.groupby(SUMMARY_KEYS, observed=True, sort=False)['型番'].agg(', '.join)
+    summary_df.insert(0, '型号', joined.reindex(summary_df.index).fillna(''))
+    summary_df = summary_df.reset_index()
+
+    # Summary keys back to plain values (same dtype inference as the default path),
+    # in the default path's row and column order
+    for key in SUMMARY_KEYS:
+        if key != '价格区间':
+            summary_df[key] = summary_df[key].to_numpy(dtype=object)
+    summary_df = summary_df.sort_values(SUMMARY_KEYS, ignore_index=True)
+    summary_df['单件净重(kg)'] = summary_df['品名'].map(snapshot.weight).astype('float64')
+    summary_df['规格'] = summary_df['品名'].map(snapshot.size)
+    summary_df['数量'] = summary_df['数量'].astype('int64') if summary_df['数量'].dtype.kind in 'iu' else summary_df['数量']
+    summary_df['总价格'] = summary_df['总价格'].astype('int64') if summary_df['总价格'].dtype.kind in 'iu' else summary_df['总价格']
+    summary_df = summary_df[SUMMARY_KEYS + ['型号', '数量', '总价格', '单件净重(kg)', '规格', '净重']]
+    memory.record('aggregated', summary_df)
+    return summary_df, unmatched
+
+def aggregate_groups(rows):
+    """
+    Aggregate matched rows into one summary row per group (before finalize_summary).
+    Runs in worker processes in sharded mode, so it must stay a top-level function.
+    """
+    # Calculate key metrics for the board
+    # Use lambda with first valid (non-null) value for weight and size
+    summary_df = rows.groupby(SUMMARY_KEYS, observed=True).agg(
+        型号=('型番', join_unique_strings),
+        数量=('Pcs', 'sum'),
+        总价格=('Total', 'sum'),
+    ).reset_index()
+
+    # Add weight and size columns separately to use Chinese column names with parentheses
+    summary_df['单件净重(kg)'] = rows.groupby(SUMMARY_KEYS, observed=True)['单件净重(kg)'].apply(
+        lambda x: x.dropna().iloc[0] if len(x.dropna()) > 0 else None
+    ).values
+
+    summary_df['规格'] = rows.groupby(SUMMARY_KEYS, observed=True)['规格'].apply(
+        lambda x: x.dropna().iloc[0] if len(x.dropna()) > 0 else None
+    ).values
+
+    summary_df['净重'] = rows.groupby(SUMMARY_KEYS, observed=True)['净重'].sum().values
+
+    return summary_df
+
+def resolve_workers(workers):
+    """
+    Number of aggregation processes for mapping_config['workers'] ('auto' = all cores).
+    Never more than the number of cores: extra processes only add start-up time.
+    """
+    cores = os.cpu_count() or 1
+    if workers == 'auto':
+        return cores
+    try:
+        return min(max(int(workers or 1), 1), cores)
+    except (TypeError, ValueError):
+        return 1
+
+def aggregate_sharded(rows, workers):
+    """
+    aggregate_groups() across a process pool.
+
+    Rows are hash-partitioned by (品牌, 品名). Both are group keys, so every
+    group lands whole in exactly one shard, and each shard keeps the
+    original row order, which preserves 型号 ordering and first-non-null
+    weight/size. The shard results are concatenated and sorted back into
+    groupby order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    shard_ids = pd.util.hash_pandas_object(rows[['品牌', '品名']], index=False).to_numpy() % workers
+    shards = [rows[shard_ids == shard] for shard in range(workers)]
+    shards = [shard for shard in shards if len(shard)]
+    print(f'🧮 Aggregating {len(rows)} rows in {len(shards)} shards')
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+        results = list(pool.map(aggregate_groups, shards))
+
+    summary_df = pd.concat(results, ignore_index=True)
+    return summary_df.sort_values(SUMMARY_KEYS, ignore_index=True)
+
 def process_manufacturer_data(file_paths, mapping_config):
     """
     Reads multiple manufacturer files, cleans them, and aggregates data.
+
+    mapping_config options:
+        include_suggestions: attach fuzzy ProductMapping candidates for 品名
+            without a mapping as summary_df.attrs['unmatched_suggestions']
+        streaming: aggregate chunk by chunk with bounded memory
+            (see process_manufacturer_data_streaming)
+        chunk_rows: rows per chunk in streaming mode
+        compact: categorical keys and narrow numerics in the in-memory path
+            (see aggregate_compact); prints a per-stage memory report
+        arrow_strings: with compact, store 型番 as Arrow-backed strings (needs pyarrow)
+        memory_report: print the per-stage memory report without compact
+        workers: aggregate the in-memory path across this many processes
+            (int or 'auto'; see aggregate_sharded)
+        snapshot: MappingSnapshot to use instead of get_snapshot(), so batch
+            jobs share one across reports
+        dedup: 'flag' (default), 'drop' or 'off' for rows repeating a row of
+            an earlier file (see drop_cross_file_duplicates); the counts are
+            attached as summary_df.attrs['dedup_stats']
+        progress: callback progress(stage, **info), called with 'parsing'
+            for each file (each chunk when streaming; file, files, filename,
+            rows read so far, bytes_done and bytes_total of the files before
+            it), then 'matching' and 'aggregating' (rows); see
+            report_progress.ProgressTracker
     """
+    if (mapping_config.get('dedup') or DEFAULT_DEDUP_MODE) not in DEDUP_MODES:
+        raise ValueError(f"dedup must be one of {', '.join(DEDUP_MODES)}")
+    if mapping_config.get('streaming'):
+        return process_manufacturer_data_streaming(file_paths, mapping_config)
+
+    progress = mapping_config.get('progress') or ignore_progress
     all_data = []
+    loaded_files = []
+    rows_read = 0
+    offsets = byte_offsets(file_paths)
     
-    for path in file_paths:
+    for file_number, path in enumerate(file_paths, 1):
+        progress('parsing', file=file_number, files=len(file_paths), filename=os.path.basename(path), rows=rows_read,
+                 bytes_done=offsets[file_number - 1], bytes_total=offsets[-1])
         try:
             # 1. Excel Parsing: Read the file into a Pandas DataFrame
             df = pd.read_excel(path)
 
             # 2. Data Cleaning & Transformation:
-
-            # Standardize column names from source Excel files
-            # Map '日文名字' to '品名' if it exists
-            if '日文名字' in df.columns and '品名' not in df.columns:
-                df.rename(columns={'日文名字': '品名'}, inplace=True)
-
-            # Drop rows with missing critical data
-            df.dropna(subset=['品牌', '品名'], inplace=True)
-            
-            # Ensure data types are correct
-            df['Pcs'] = pd.to_numeric(df['Pcs'], errors='coerce')
-            df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
+            df = clean_manufacturer_frame(df)
             
             all_data.append(df)
+            loaded_files.append(path)
+            rows_read += len(df)
             
         except Exception as e:
             print(f"Error processing {path}: {e}")
@@ -170,136 +520,260 @@ def process_manufacturer_data(file_paths, mapping_config):
     if not all_data:
         return pd.DataFrame() # Return empty if no data
     
+    file_ids = np.repeat(np.arange(len(all_data)), [len(df) for df in all_data])
     master_df = pd.concat(all_data, ignore_index=True)
+    del all_data
+
+    # Drop rows re-sent in another file before spending any matching work on them
+    stats = None
+    dedup_mode = mapping_config.get('dedup') or DEFAULT_DEDUP_MODE
+    if dedup_mode != 'off':
+        master_df, stats = drop_cross_file_duplicates(master_df, file_ids, loaded_files, dedup_mode)
+
+    memory = MemoryReport(mapping_config.get('compact') or mapping_config.get('memory_report'))
+    memory.record('loaded', master_df)
+    progress('matching', rows=len(master_df))
+
+    # Known names, brand mappings and weight/size come from one cached snapshot
+    # of the mapping tables; the matcher includes every ProductMapping name, which
+    # improves coverage from ~34% to ~59% by matching product name variants
+    snapshot = mapping_config.get('snapshot') or get_snapshot()
+    print(f'📚 Combined KNOWN_NAMES: {len(snapshot.matcher)} names ({len(snapshot.known_names)} known + {len(snapshot.product_mappings)} from ProductMapping)')
+
+    if mapping_config.get('compact'):
+        summary_df, unmatched = aggregate_compact(
+            master_df, snapshot, memory,
+            arrow_strings=mapping_config.get('arrow_strings'),
+            count_unmatched=mapping_config.get('include_suggestions'),
+            progress=progress,
+        )
+        summary_df = finalize_summary(summary_df)
+        memory.record('summary', summary_df)
+        memory.attach(summary_df)
+        summary_df.attrs['dedup_stats'] = stats
+        if unmatched is not None:
+            print(f'🧩 {len(unmatched)} distinct names without a ProductMapping entry')
+            summary_df.attrs['unmatched_suggestions'] = unmatched_suggestions(snapshot, unmatched)
+        return summary_df
+
+    # Supplier files repeat the same 品名 on many rows, so match each distinct
+    # name once and broadcast the results back through the factorized codes.
+    # Case-insensitive substring match against the known names; unmatched names are kept as-is.
+    # Names seen in earlier reports come from the match memo table instead of the matcher.
+    name_codes, raw_names = pd.factorize(master_df['品名'])
+    canonical_list, memo_hits = canonical_names_memoized(snapshot, raw_names)
+    canonical_names = pd.Series(canonical_list, dtype=object)
+    master_df['品名'] = broadcast(canonical_names, name_codes)
+    print(f'🔎 Matched {len(raw_names)} distinct names for {len(master_df)} rows ({memo_hits} from memo)')
+
+    master_df['价格区间'] = price_band(master_df['Price'])
+
+    brand_codes, raw_brands = pd.factorize(master_df['品牌'])
+    master_df['品牌'] = broadcast(pd.Series([snapshot.reference_brand(b) for b in raw_brands], dtype=object), brand_codes)
+
+    # Weight/size come from the ProductMapping table ONLY, looked up once per distinct name
+    # Excel files should NOT contain 单件净重(kg) or 规格, and any such columns are overwritten
+    master_df['单件净重(kg)'] = broadcast(pd.Series([snapshot.weight(n) for n in canonical_names]), name_codes)
+    master_df['规格'] = broadcast(pd.Series([snapshot.size(n) for n in canonical_names], dtype=object), name_codes)
+
+    if mapping_config.get('include_suggestions'):
+        has_mapping = master_df['品名'].isin(list(snapshot.product_mappings))
+        unmatched = master_df.loc[~has_mapping, '品名'].value_counts()
+        print(f'🧩 {len(unmatched)} distinct names without a ProductMapping entry')
+        suggestions_df = unmatched_suggestions(snapshot, unmatched)
 
-    # Load known product names from database
-    KNOWN_NAMES = load_known_names_from_db()
-
-    # Add all ProductMapping product names to KNOWN_NAMES for better matching coverage
-    # This improves coverage from ~34% to ~59% by matching product name variants
-    product_mappings = load_product_mappings_from_db()
-    KNOWN_NAMES = list(set(KNOWN_NAMES) | set(product_mappings.keys()))
-    print(f'📚 Combined KNOWN_NAMES: {len(KNOWN_NAMES)} names (50 original + {len(product_mappings)} from ProductMapping)')
+    # Calculate 净重 (net weight) = 单件净重(kg) * Pcs
+    master_df['净重'] = master_df['单件净重(kg)'] * master_df['Pcs']
 
-    # Escape special characters and join with '|' for OR logic
-    # (\b ensures it matches whole words, but for substring matching, it's optional)
-    # The (?i) makes the pattern case-insensitive
-    pattern = '(?i)(' + '|'.join(map(re.escape, KNOWN_NAMES)) + ')'
+    memory.record('matched', master_df)
+    progress('aggregating', rows=len(master_df))
 
-    master_df['品名'] = (
-        master_df['品名'].str.extract(pattern, expand=True)[0].fillna(master_df['品名'])
-    )
+    workers = resolve_workers(mapping_config.get('workers'))
+    if workers > 1:
+        summary_df = aggregate_sharded(master_df, workers)
+    else:
+        summary_df = aggregate_groups(master_df)
 
-    # 1. Define the numerical thresholds (bins)
-    # Note: The first bin must be lower than your minimum price, and the last must be higher than your maximum price.
-    # Use -np.inf and np.inf to catch all possible values.
-    price_bins = [
-        -np.inf, # Lowest possible number
-        500,     # Upper bound for the first category
-        1000,    # Upper bound for the second category
-        2500,    # Upper bound for the third category
-        5000,    # Upper bound for the 4th category
-        10000,    # Upper bound for the 5th category
-        20000,    # Upper bound for the 6th category
-        30000,    # Upper bound for the 7th category
-        np.inf   # Highest possible number
-    ]
-    # 2. Define the corresponding labels (must have one less label than bins)
-    price_labels = [
-        'less_than_500', 
-        '500_to_1000', 
-        '1000_to_2500', 
-        '2500_to_5000',
-        '5000_to_10000', 
-        '10000_to_20000', 
-        '20000_to_30000', 
-        'over_30000'
-    ]
-    master_df['价格区间'] = pd.cut(
-        master_df['Price'],
-        bins=price_bins,
-        labels=price_labels,
-        right=True, # Intervals are (a, b] - means 500 goes into the '500_to_1000' category
-        include_lowest=True # Ensures the lowest value in the data is captured
-    )
+    summary_df = finalize_summary(summary_df)
+    memory.record('summary', summary_df)
+    memory.attach(summary_df)
+    summary_df.attrs['dedup_stats'] = stats
 
-    # Load brand mappings from database
-    value_mapping = load_brand_mappings_from_db()
+    if mapping_config.get('include_suggestions'):
+        summary_df.attrs['unmatched_suggestions'] = suggestions_df
 
-    master_df['品牌'] = (
-        master_df['品牌']
-        .map(value_mapping)
-        # The crucial step: fill the NaNs (unmapped values)
-        # with the corresponding values from the original column.
-        .fillna(master_df['品牌'])
-    )
+    return summary_df
 
-    # Load product weight/size mappings from database ONLY
-    # Excel files should NOT contain 单件净重(kg) or 规格 - all data comes from ProductMapping table
-    product_mappings = load_product_mappings_from_db()
+class GroupTotals:
+    """Running aggregates of one summary group in streaming mode."""
+    __slots__ = ('models', 'quantity', 'total', 'net_weight')
 
-    # Create mapping functions
-    def get_weight(product_name):
-        mapping = product_mappings.get(product_name)
-        return mapping['weight'] if mapping and mapping['weight'] is not None else None
+    def __init__(self):
+        self.models = {}        # 型番 strings in first-seen order (dict as ordered set)
+        self.quantity = 0
+        self.total = 0
+        self.net_weight = 0
 
-    def get_size(product_name):
-        mapping = product_mappings.get(product_name)
-        return mapping['size'] if mapping and mapping['size'] is not None else None
+    def merge(self, other):
+        for model in other.models:
+            self.models.setdefault(model, None)
+        self.quantity += other.quantity
+        self.total += other.total
+        self.net_weight += other.net_weight
 
-    # Always populate 单件净重(kg) and 规格 from database, ignoring any Excel columns
-    # This ensures we ONLY use data from ProductMapping table
-    master_df['单件净重(kg)'] = master_df['品名'].apply(get_weight)
-    master_df['规格'] = master_df['品名'].apply(get_size)
-
-    # Calculate 净重 (net weight) = 单件净重(kg) * Pcs
-    master_df['净重'] = master_df['单件净重(kg)'] * master_df['Pcs']
+def fold_chunk(chunk, snapshot, resolved, groups, unmatched=None, dedup=None):
+    """
+    Clean, match and aggregate one chunk of raw rows into `groups`
+    ({group key tuple: GroupTotals}).
 
-    # Calculate key metrics for the board
-    # Use lambda with first valid (non-null) value for weight and size
-    summary_df = master_df.groupby(['品牌', '品名', '价格区间', '分類','産地'], observed=True).agg(
-        型号=('型番', join_unique_strings),
+    Args:
+        resolved: raw 品名 -> canonical 品名 cache shared across chunks
+        unmatched: optional Counter of rows per 品名 without a ProductMapping entry
+        dedup: optional CrossFileDedup applied to the cleaned rows before matching
+    """
+    # Same cleaning as the in-memory path
+    if '日文名字' in chunk.columns and '品名' not in chunk.columns:
+        chunk = chunk.rename(columns={'日文名字': '品名'})
+    chunk = chunk.dropna(subset=['品牌', '品名'])
+    if chunk.empty:
+        return
+    chunk = chunk.assign(
+        Pcs=pd.to_numeric(chunk['Pcs'], errors='coerce'),
+        Price=pd.to_numeric(chunk['Price'], errors='coerce'),
+        Total=pd.to_numeric(chunk['Total'], errors='coerce') if 'Total' in chunk.columns else np.nan,
+    )
+    for column in ('型番', '分類', '産地'):
+        if column not in chunk.columns:
+            chunk[column] = None
+    if dedup is not None:
+        chunk = dedup.filter(chunk)
+        if chunk.empty:
+            return
+
+    # Match each distinct name once per run; names seen in earlier chunks come from `resolved`
+    name_codes, raw_names = pd.factorize(chunk['品名'])
+    new_names = [name for name in raw_names if name not in resolved]
+    if new_names:
+        canonical_list, _ = canonical_names_memoized(snapshot, new_names)
+        resolved.update(zip(new_names, canonical_list))
+    canonical_names = pd.Series([resolved[name] for name in raw_names], dtype=object)
+    chunk['品名'] = broadcast(canonical_names, name_codes)
+
+    brand_codes, raw_brands = pd.factorize(chunk['品牌'])
+    chunk['品牌'] = broadcast(pd.Series([snapshot.reference_brand(b) for b in raw_brands], dtype=object), brand_codes)
+    chunk['价格区间'] = price_band(chunk['Price'])
+    weights = pd.Series([snapshot.weight(n) for n in canonical_names], dtype=float)
+    chunk['净重'] = broadcast(weights, name_codes) * chunk['Pcs']
+
+    if unmatched is not None:
+        has_mapping = canonical_names.map(snapshot.product_mappings.__contains__).to_numpy(dtype=bool)
+        unmatched.update(chunk.loc[~has_mapping[name_codes], '品名'].value_counts().to_dict())
+
+    partial = chunk.groupby(SUMMARY_KEYS, observed=True, sort=False).agg(
         数量=('Pcs', 'sum'),
         总价格=('Total', 'sum'),
-    ).reset_index()
-
-    # Add weight and size columns separately to use Chinese column names with parentheses
-    summary_df['单件净重(kg)'] = master_df.groupby(['品牌', '品名', '价格区间', '分類','産地'], observed=True)['单件净重(kg)'].apply(
-        lambda x: x.dropna().iloc[0] if len(x.dropna()) > 0 else None
-    ).values
-
-    summary_df['规格'] = master_df.groupby(['品牌', '品名', '价格区间', '分類','産地'], observed=True)['规格'].apply(
-        lambda x: x.dropna().iloc[0] if len(x.dropna()) > 0 else None
-    ).values
+        净重=('净重', 'sum'),
+    )
+    for key, quantity, total, net_weight in partial.itertuples(name=None):
+        totals = groups.get(key)
+        if totals is None:
+            totals = groups[key] = GroupTotals()
+        totals.quantity += quantity
+        totals.total += total
+        totals.net_weight += net_weight
+
+    # Distinct (group, 型番) pairs in row order extend each group's ordered model set
+    models = chunk.loc[chunk['型番'].notna(), SUMMARY_KEYS + ['型番']]
+    models = models.assign(型番=models['型番'].astype(str)).drop_duplicates()
+    for *key, model in models.itertuples(index=False, name=None):
+        totals = groups.get(tuple(key))
+        if totals is not None:
+            totals.models.setdefault(model, None)
+
+def process_manufacturer_data_streaming(file_paths, mapping_config):
+    """
+    Bounded-memory variant of process_manufacturer_data for very large inputs.
 
-    summary_df['净重'] = master_df.groupby(['品牌', '品名', '价格区间', '分類','産地'], observed=True)['净重'].sum().values
+    Each workbook is streamed in chunks (openpyxl read-only mode); every
+    chunk is cleaned, matched and folded into running per-group aggregates
+    (sums, ordered unique 型番 sets), so peak memory scales with the number
+    of distinct summary groups instead of the number of input rows.
 
-    # Replace 净重 with None if value is 0 (means no weight data available)
-    summary_df['净重'] = summary_df['净重'].apply(lambda x: None if x == 0 else x)
+    Cell values are taken as written rather than through pandas' per-column
+    dtype inference, so a numeric 型番 such as 123 reads as '123' (the
+    in-memory path shows '123.0' when the column also has blanks).
+    """
+    from workbook_reader import iter_excel_chunks
+
+    snapshot = mapping_config.get('snapshot') or get_snapshot()
+    print(f'📚 Combined KNOWN_NAMES: {len(snapshot.matcher)} names ({len(snapshot.known_names)} known + {len(snapshot.product_mappings)} from ProductMapping)')
+
+    chunk_rows = mapping_config.get('chunk_rows') or STREAM_CHUNK_ROWS
+    include_suggestions = mapping_config.get('include_suggestions')
+    unmatched = Counter() if include_suggestions else None
+    resolved = {}
+    groups = {}
+    rows_read = 0
+    files_read = 0
+    dedup_mode = mapping_config.get('dedup') or DEFAULT_DEDUP_MODE
+    dedup = CrossFileDedup(dedup_mode) if dedup_mode != 'off' else None
+    progress = mapping_config.get('progress') or ignore_progress
+    offsets = byte_offsets(file_paths)
+
+    for file_number, path in enumerate(file_paths, 1):
+        # Fold each file separately so a file that fails midway contributes nothing
+        file_groups = {}
+        file_unmatched = Counter() if include_suggestions else None
+        file_rows = 0
+        try:
+            for chunk in iter_excel_chunks(path, chunk_rows):
+                # Matching and aggregation happen per chunk, so 'parsing' covers them
+                progress('parsing', file=file_number, files=len(file_paths), filename=os.path.basename(path),
+                         rows=rows_read + file_rows, bytes_done=offsets[file_number - 1], bytes_total=offsets[-1])
+                file_rows += len(chunk)
+                fold_chunk(chunk, snapshot, resolved, file_groups, file_unmatched, dedup)
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+            if dedup is not None:
+                dedup.end_file(path, completed=False)
+            continue
+        if dedup is not None:
+            dedup.end_file(path)
+
+        for key, totals in file_groups.items():
+            if key in groups:
+                groups[key].merge(totals)
+            else:
+                groups[key] = totals
+        if include_suggestions:
+            unmatched.update(file_unmatched)
+        rows_read += file_rows
+        files_read += 1
+
+    if not files_read:
+        return pd.DataFrame() # Return empty if no data
 
-    summary_df['毛重'] = summary_df['净重'] * random.uniform(1.08, 1.12)
+    print(f'🌊 Streamed {rows_read} rows from {files_read} files into {len(groups)} groups')
+    progress('aggregating', rows=rows_read)
 
-    # Build 报关 column with model information
-    summary_df['报关'] = np.where(
-        (summary_df['型号'].isna()) | (summary_df['型号'] == ''),
-        '型号：无型号',
-        '型号：' + summary_df['型号'].astype(str)
+    summary_df = pd.DataFrame(
+        [
+            (*key, ', '.join(totals.models), totals.quantity, totals.total,
+             snapshot.weight(key[1]), snapshot.size(key[1]), totals.net_weight)
+            for key, totals in groups.items()
+        ],
+        columns=SUMMARY_KEYS + ['型号', '数量', '总价格', '单件净重(kg)', '规格', '净重'],
     )
+    summary_df['价格区间'] = pd.Categorical(summary_df['价格区间'], categories=PRICE_LABELS, ordered=True)
+    # Same group order as groupby(sort=True) in the in-memory path
+    summary_df = summary_df.sort_values(SUMMARY_KEYS, ignore_index=True)
 
-    # Add prefix for ADULT TOY category
-    adult_toy_prefix = '成人用品 成人解决生理需求用|热塑性弹性体TPE制 '
-    summary_df['报关'] = np.where(
-        (summary_df['分類'] == 'ADULT TOY') | (summary_df['分類'] == 'ELECTRIC ADULT TOY') | (summary_df['分類'] == 'CLOTHING'),
-        adult_toy_prefix + summary_df['报关'],
-        summary_df['报关']
-    )
+    summary_df = finalize_summary(summary_df)
+    summary_df.attrs['dedup_stats'] = dedup.stats() if dedup is not None else None
 
-    # add prefix for lotion category
-    lotion_prefix = '润滑液人体润滑用|水90%，甘油5%，聚丙烯酸钠5%|不含从石油或沥青提取矿物油类 '
-    summary_df['报关'] = np.where(
-        summary_df['分類'] == 'LOTION',
-        lotion_prefix + summary_df['报关'],
-        summary_df['报关']
-    )
+    if include_suggestions:
+        counts = pd.Series(unmatched, dtype='int64').sort_values(ascending=False)
+        print(f'🧩 {len(counts)} distinct names without a ProductMapping entry')
+        summary_df.attrs['unmatched_suggestions'] = unmatched_suggestions(snapshot, counts)
 
-    return summary_df
\ No newline at end of file
+    return summary_df
@@ -1,6 +1,11 @@
 # database.py
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text, column, event, update, inspect, bindparam
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.dml import Insert, Update, Delete
+import json
 from datetime import datetime
+from name_matcher import normalize_name, NORMALIZATION_VERSION
 
 db = SQLAlchemy()
 
@@ -16,17 +21,69 @@ class Report(db.Model):
     parameters = db.Column(db.Text) # Store report parameters as JSON string
     # Stores the list of uploaded files that contributed to the report
     source_files = db.Column(db.Text)
+    # JSON: rows per source file that repeated a row of an earlier file (see data_processor.dedup_stats)
+    dedup_stats = db.Column(db.Text, nullable=True)
 
     def __repr__(self):
         return f'<Report {self.id}>'
     
+# Bump whenever models or schema setup change. Workers skip create_all()
+# on boot when the database already records this version.
+SCHEMA_VERSION = 8
+
 def init_db(app):
     """Initializes the database connection with the Flask app."""
     db.init_app(app)
     with app.app_context():
+        if get_schema_version() == SCHEMA_VERSION:
+            return
         # Create all tables defined in the models
         db.create_all()
-    
+        ensure_name_keys()
+        ensure_columns(ADDED_COLUMNS)
+        create_search_indexes()
+        ensure_table_versions()
+        set_schema_version(SCHEMA_VERSION)
+
+def get_schema_version():
+    """Return the schema version stored in app_meta, or None if it is missing."""
+    try:
+        value = db.session.execute(
+            db.select(AppMeta.value).where(AppMeta.key == 'schema_version')
+        ).scalar()
+        return int(value) if value is not None else None
+    except Exception:
+        # app_meta does not exist yet (fresh database)
+        return None
+    finally:
+        db.session.rollback()
+
+def set_schema_version(version):
+    meta = db.session.get(AppMeta, 'schema_version')
+    if meta is None:
+        db.session.add(AppMeta(key='schema_version', value=str(version)))
+    else:
+        meta.value = str(version)
+    db.session.commit()
+
+# Key/value store for application metadata (e.g. schema_version)
+class AppMeta(db.Model):
+    __tablename__ = 'app_meta'
+
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(255))
+
+# Per-table change counters used for ETags and cache invalidation
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+
+    table_name = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def _name_key_default(context):
+    """Column default: fill name_key from the product_name being inserted."""
+    return normalize_name(context.get_current_parameters().get('product_name'))
+
 # Model for Manufacturer Configuration Mapping
 class ManufacturerMapping(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,6 +99,7 @@ class ProductMapping(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     product_name = db.Column(db.String(255), unique=True, nullable=False)  # 品名
+    name_key = db.Column(db.String(255), index=True, default=_name_key_default)  # normalize_name(品名)
     box_weight = db.Column(db.Float, nullable=True)  # 箱重量 in kg
     box_size = db.Column(db.String(100), nullable=True)  # 箱尺寸 (e.g., "41*36*25")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -90,6 +148,7 @@ class KnownProductName(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     product_name = db.Column(db.String(255), unique=True, nullable=False)
+    name_key = db.Column(db.String(255), index=True, default=_name_key_default)  # normalize_name(product_name)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -101,4 +160,321 @@ class KnownProductName(db.Model):
         }
 
     def __repr__(self):
-        return f'<KnownProductName {self.product_name}>'
\ No newline at end of file
+        return f'<KnownProductName {self.product_name}>'
+
+# Memo of raw 品名 -> canonical 品名 matches, valid for one mapping generation
+# (see name_matcher.match_generation); rows from older generations are ignored
+class NameMatchMemo(db.Model):
+    __tablename__ = 'name_match_memo'
+
+    raw_name = db.Column(db.String(255), primary_key=True)
+    canonical_name = db.Column(db.String(255), nullable=False)
+    generation = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NameMatchMemo {self.raw_name} → {self.canonical_name}>'
+
+# Catalog of workbooks in the uploads folder: header, dimensions and detected
+# schema, sniffed once at upload time (see upload_catalog)
+class UploadedFile(db.Model):
+    __tablename__ = 'uploaded_files'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), unique=True, nullable=False)  # name inside UPLOAD_FOLDER
+    content_hash = db.Column(db.String(64), index=True)  # sha256 of the file
+    file_size = db.Column(db.BigInteger)
+    modified_ns = db.Column(db.BigInteger)  # st_mtime_ns when cataloged, for staleness checks
+    sheet_names = db.Column(db.Text)  # JSON list
+    columns = db.Column(db.Text)  # JSON list: header row of the first sheet
+    row_count = db.Column(db.Integer, nullable=True)  # data rows of the first sheet, from its dimensions
+    detected_schema = db.Column(db.String(30), nullable=True, index=True)  # manufacturer, mapping_source or None
+    missing_columns = db.Column(db.Text)  # JSON list, for the closest schema when none matched
+    error = db.Column(db.Text, nullable=True)  # set when the workbook could not be opened
+    cataloged_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert model instance to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'content_hash': self.content_hash,
+            'file_size': self.file_size,
+            'sheet_names': json.loads(self.sheet_names or '[]'),
+            'columns': json.loads(self.columns or '[]'),
+            'row_count': self.row_count,
+            'schema': self.detected_schema,
+            'missing_columns': json.loads(self.missing_columns or '[]'),
+            'error': self.error,
+            'cataloged_at': self.cataloged_at.isoformat() if self.cataloged_at else None
+        }
+
+    def __repr__(self):
+        return f'<UploadedFile {self.filename}: {self.detected_schema}>'
+
+# One processed manufacturer upload in the fact store (see fact_store)
+class UploadFactSource(db.Model):
+    __tablename__ = 'upload_fact_sources'
+
+    upload_hash = db.Column(db.String(64), primary_key=True)  # sha256 of the workbook
+    filename = db.Column(db.String(255))
+    rows = db.Column(db.Integer)  # cleaned rows read from the workbook
+    groups = db.Column(db.Integer)  # upload_facts rows stored
+    generation = db.Column(db.String(64))  # name_matcher.match_generation() at ingest time
+    uploaded_at = db.Column(db.DateTime, index=True)  # period the upload belongs to (file mtime by default)
+    ingested_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        """Convert model instance to dictionary for JSON serialization"""
+        return {
+            'upload_hash': self.upload_hash,
+            'filename': self.filename,
+            'rows': self.rows,
+            'groups': self.groups,
+            'generation': self.generation,
+            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
+            'ingested_at': self.ingested_at.isoformat() if self.ingested_at else None
+        }
+
+    def __repr__(self):
+        return f'<UploadFactSource {self.filename}: {self.groups} groups>'
+
+# Partial aggregates of one upload per (raw 品牌, canonical 品名, 价格区间, 分類, 産地);
+# brand mapping and weight/size are applied when facts are consolidated
+class UploadFact(db.Model):
+    __tablename__ = 'upload_facts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    upload_hash = db.Column(db.String(64), nullable=False, index=True)
+    brand = db.Column(db.String(255), nullable=False, index=True)  # 品牌 as written in the upload
+    product_name = db.Column(db.String(255), nullable=False, index=True)  # canonical 品名
+    price_band = db.Column(db.String(30), nullable=False)  # 价格区间 label
+    category = db.Column(db.String(255), nullable=False)  # 分類
+    origin = db.Column(db.String(255), nullable=False)  # 産地
+    models = db.Column(db.Text)  # JSON list of distinct 型番 in first-seen order
+    quantity = db.Column(db.Float)  # sum of Pcs
+    total = db.Column(db.Float)  # sum of Total
+    rows = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<UploadFact {self.brand} {self.product_name}>'
+
+# ===== Normalized name keys =====
+# product_mapping and known_product_names store normalize_name(product_name)
+# in name_key for O(1) exact lookups. Inserts (ORM and Core) fill it through
+# the column default; ORM renames refresh it below.
+
+NAME_KEY_MODELS = [ProductMapping, KnownProductName]
+
+@event.listens_for(ProductMapping, 'before_update')
+@event.listens_for(KnownProductName, 'before_update')
+def _refresh_name_key(mapper, connection, target):
+    target.name_key = normalize_name(target.product_name)
+
+def ensure_name_keys():
+    """
+    Add the name_key column to databases created before it existed, and
+    recompute every stored key when NORMALIZATION_VERSION has changed.
+    """
+    stored = db.session.get(AppMeta, 'normalization_version')
+    if stored is not None and stored.value == str(NORMALIZATION_VERSION):
+        return
+
+    inspector = inspect(db.engine)
+    for model in NAME_KEY_MODELS:
+        table = model.__tablename__
+        if 'name_key' not in {c['name'] for c in inspector.get_columns(table)}:
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN name_key VARCHAR(255)'))
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_name_key ON {table} (name_key)'))
+
+        rows = db.session.execute(db.select(model.id, model.product_name)).all()
+        if rows:
+            # Core UPDATE that sets every onupdate column (updated_at) to itself,
+            # so recomputing keys leaves the audit timestamps untouched
+            columns = model.__table__.c
+            unchanged = {c.name: c for c in columns if c.onupdate is not None}
+            db.session.execute(
+                update(model.__table__)
+                .where(columns.id == bindparam('row_id'))
+                .values(name_key=bindparam('key'), **unchanged),
+                [{'row_id': row_id, 'key': normalize_name(name)} for row_id, name in rows]
+            )
+
+    if stored is None:
+        db.session.add(AppMeta(key='normalization_version', value=str(NORMALIZATION_VERSION)))
+    else:
+        stored.value = str(NORMALIZATION_VERSION)
+    db.session.commit()
+
+# ===== Columns added after their table =====
+# create_all() never alters existing tables, so columns added to a model
+# later are added here on older databases: (table, column, DDL type).
+
+ADDED_COLUMNS = [
+    ('report_history', 'dedup_stats', 'TEXT'),
+]
+
+def ensure_columns(columns):
+    inspector = inspect(db.engine)
+    for table, column_name, ddl_type in columns:
+        if column_name not in {c['name'] for c in inspector.get_columns(table)}:
+            db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column_name} {ddl_type}'))
+    db.session.commit()
+
+# ===== Substring search indexes =====
+# Backs the `search` filter of the mapping list endpoints:
+# pg_trgm GIN indexes on PostgreSQL, FTS5 trigram tables on SQLite.
+
+SEARCH_INDEX_COLUMNS = {
+    'product_mapping': ['product_name'],
+    'brand_mapping': ['brand_name', 'reference_name'],
+    'known_product_names': ['product_name'],
+}
+
+# Trigram indexes cannot answer searches shorter than this
+MIN_INDEXED_SEARCH_LENGTH = 3
+
+_sqlite_fts_tables = None
+
+def create_search_indexes():
+    """Create the substring search indexes for the current backend (idempotent)."""
+    global _sqlite_fts_tables
+    dialect = db.engine.dialect.name
+
+    if dialect == 'postgresql':
+        try:
+            db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for table, columns in SEARCH_INDEX_COLUMNS.items():
+                for col in columns:
+                    db.session.execute(text(
+                        f'CREATE INDEX IF NOT EXISTS ix_{table}_{col}_trgm '
+                        f'ON {table} USING gin ({col} gin_trgm_ops)'
+                    ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: Could not create trigram search indexes: {e}")
+
+    elif dialect == 'sqlite':
+        try:
+            for table, columns in SEARCH_INDEX_COLUMNS.items():
+                fts = f'{table}_fts'
+                cols = ', '.join(columns)
+                new_cols = ', '.join(f'new.{c}' for c in columns)
+                old_cols = ', '.join(f'old.{c}' for c in columns)
+                db.session.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{cols}, content='{table}', content_rowid='id', tokenize='trigram')"
+                ))
+                db.session.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+                ))
+                db.session.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+                ))
+                db.session.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                    f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+                ))
+                # Backfill from rows written before the index existed
+                db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Warning: Could not create FTS5 search indexes: {e}")
+        _sqlite_fts_tables = None
+
+def _sqlite_fts_available(table):
+    """Whether the FTS5 table for `table` exists (looked up once per process)."""
+    global _sqlite_fts_tables
+    if _sqlite_fts_tables is None:
+        rows = db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"
+        ))
+        _sqlite_fts_tables = {name for (name,) in rows}
+    return f'{table}_fts' in _sqlite_fts_tables
+
+def search_filter(model, column_names, term):
+    """
+    Build a criterion matching rows where any of `column_names` contains `term`.
+
+    On SQLite this goes through the FTS5 trigram table; on PostgreSQL the
+    LIKE '%term%' predicate is served by the pg_trgm GIN indexes.
+    """
+    table = model.__tablename__
+    dialect = db.session.get_bind().dialect.name
+
+    if (dialect == 'sqlite' and len(term) >= MIN_INDEXED_SEARCH_LENGTH
+            and _sqlite_fts_available(table)):
+        fts = f'{table}_fts'
+        phrase = '"' + term.replace('"', '""') + '"'
+        query = '{' + ' '.join(column_names) + '} : ' + phrase
+        matches = text(f"SELECT rowid FROM {fts} WHERE {fts} MATCH :query").bindparams(query=query)
+        return model.id.in_(matches.columns(column('rowid')))
+
+    return db.or_(*[getattr(model, c).contains(term, autoescape=True) for c in column_names])
+
+# ===== Table change counters =====
+# Every INSERT/UPDATE/DELETE against a versioned table bumps its counter in
+# the same transaction, whether it comes from an ORM flush, a bulk
+# statement or a Core statement on engine.begin(). Raw text() SQL is not
+# tracked.
+#
+# report_history is written by every report run, so it has no counter; its
+# version is derived from the rows themselves (see _report_history_version).
+
+VERSIONED_TABLES = ['product_mapping', 'brand_mapping', 'known_product_names']
+
+def _report_history_version():
+    """Report count per status: changes whenever a report is added, finishes or is deleted."""
+    rows = db.session.execute(
+        db.select(Report.status, db.func.count()).group_by(Report.status).order_by(Report.status)
+    )
+    return [[status, count] for status, count in rows]
+
+DERIVED_VERSIONS = {'report_history': _report_history_version}
+
+def ensure_table_versions():
+    """Create a counter row for every versioned table that lacks one."""
+    existing = {v.table_name for v in TableVersion.query.all()}
+    for table_name in VERSIONED_TABLES:
+        if table_name not in existing:
+            db.session.add(TableVersion(table_name=table_name, version=0))
+    db.session.commit()
+
+def get_table_versions(table_names=None):
+    """Return {table_name: version} for the given (default: all) versioned tables."""
+    table_names = table_names or VERSIONED_TABLES + list(DERIVED_VERSIONS)
+    rows = db.session.execute(
+        db.select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(table_names))
+    )
+    versions = {name: 0 for name in table_names}
+    versions.update({name: version for name, version in rows})
+    versions.update({name: DERIVED_VERSIONS[name]() for name in table_names if name in DERIVED_VERSIONS})
+    return versions
+
+@event.listens_for(Engine, 'after_execute')
+def _bump_table_version(conn, clauseelement, multiparams, params, execution_options, result):
+    """
+    Bump the counter of a versioned table after a write to it.
+
+    The UPDATE row-locks the table's counter until the writer commits, so on
+    PostgreSQL concurrent writers to the same table run one after another.
+    That is fine for the mapping tables, which change through edits and
+    imports; tables written on a hot path must not be added here.
+    """
+    if not isinstance(clauseelement, (Insert, Update, Delete)):
+        return
+    table_name = getattr(clauseelement.table, 'name', None)
+    if table_name not in VERSIONED_TABLES or result.rowcount == 0:
+        return
+    table = TableVersion.__table__
+    conn.execute(
+        update(table)
+        .where(table.c.table_name == table_name)
+        .values(version=table.c.version + 1)
+    )
@@ -0,0 +1,173 @@
+# fact_store.py
+"""
+Per-upload partial aggregates for consolidating many periods in SQL.
+
+ingest_upload() reads a manufacturer workbook once, matches its 品名 and
+stores one upload_facts row per (raw 品牌, canonical 品名, 价格区间, 分類, 産地)
+group, keyed by the workbook's content hash. consolidate() then builds a
+board summary over any set of stored uploads with one GROUP BY. Brand
+mappings and ProductMapping weight/size are joined in at query time, so
+the summary always reflects the current mapping tables and no workbook is
+parsed again.
+"""
+import json
+import os
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import insert, delete
+from database import db, UploadFact, UploadFactSource, BrandMapping, ProductMapping
+from data_processor import (
+    SUMMARY_KEYS, PRICE_LABELS, clean_manufacturer_frame, price_band, broadcast, finalize_summary
+)
+from name_matcher import canonical_names_memoized, match_generation
+from upload_catalog import file_digest
+
+FACT_INSERT_CHUNK = 1000
+
+
+def fact_records(df, upload_hash):
+    """Group cleaned, matched rows of one upload into upload_facts records."""
+    for column in ('型番', '分類', '産地'):
+        if column not in df.columns:
+            df[column] = None
+    df = df.assign(Total=pd.to_numeric(df['Total'], errors='coerce') if 'Total' in df.columns else float('nan'))
+
+    # Same keys (and the same dropping of blank keys) as the report's groupby
+    grouped = df.groupby(SUMMARY_KEYS, observed=True, sort=False)
+    parts = grouped.agg(quantity=('Pcs', 'sum'), total=('Total', 'sum'), rows=('Pcs', 'size'))
+    models = grouped['型番'].agg(lambda s: json.dumps(list(s.dropna().astype(str).unique()), ensure_ascii=False))
+
+    return [
+        {
+            'upload_hash': upload_hash,
+            'brand': str(brand),
+            'product_name': str(name),
+            'price_band': str(band),
+            'category': str(category),
+            'origin': str(origin),
+            'models': models.loc[(brand, name, band, category, origin)],
+            'quantity': float(quantity),
+            'total': float(total),
+            'rows': int(rows),
+        }
+        for (brand, name, band, category, origin), quantity, total, rows in parts.itertuples(name=None)
+    ]
+
+
+def ingest_upload(path, snapshot, upload_hash=None, uploaded_at=None, replace=False):
+    """
+    Store the facts of one manufacturer workbook unless its content hash is
+    already stored (replace=True re-ingests, e.g. after mapping changes).
+
+    Args:
+        uploaded_at: period of the upload, defaults to the file's mtime
+
+    Returns:
+        dict with upload_hash, filename, rows, groups and cached
+    """
+    upload_hash = upload_hash or file_digest(path)
+    source = db.session.get(UploadFactSource, upload_hash)
+    if source is not None and not replace:
+        return {**source.to_dict(), 'cached': True}
+
+    df = clean_manufacturer_frame(pd.read_excel(path))
+    name_codes, raw_names = pd.factorize(df['品名'])
+    canonical_list, _ = canonical_names_memoized(snapshot, raw_names)
+    df['品名'] = broadcast(pd.Series(canonical_list, dtype=object), name_codes)
+    df['价格区间'] = price_band(df['Price'])
+    records = fact_records(df, upload_hash)
+
+    db.session.execute(delete(UploadFact).where(UploadFact.upload_hash == upload_hash))
+    for start in range(0, len(records), FACT_INSERT_CHUNK):
+        db.session.execute(insert(UploadFact), records[start:start + FACT_INSERT_CHUNK])
+
+    if source is None:
+        source = UploadFactSource(upload_hash=upload_hash)
+        db.session.add(source)
+    source.filename = os.path.basename(path)
+    source.rows = len(df)
+    source.groups = len(records)
+    source.generation = match_generation(snapshot.versions) if snapshot.versions else None
+    source.uploaded_at = uploaded_at or datetime.utcfromtimestamp(os.path.getmtime(path))
+    source.ingested_at = datetime.utcnow()
+    db.session.commit()
+
+    print(f'🗄️  Stored {len(records)} fact groups for {source.filename} ({len(df)} rows)')
+    return {**source.to_dict(), 'cached': False}
+
+
+def source_filters(since=None, until=None, upload_hashes=None):
+    filters = []
+    if since is not None:
+        filters.append(UploadFactSource.uploaded_at >= since)
+    if until is not None:
+        filters.append(UploadFactSource.uploaded_at < until)
+    if upload_hashes:
+        filters.append(UploadFactSource.upload_hash.in_(upload_hashes))
+    return filters
+
+
+def consolidate(snapshot, since=None, until=None, upload_hashes=None):
+    """
+    Board summary over the stored uploads in [since, until) and/or the given
+    hashes, in the same shape and order as process_manufacturer_data().
+
+    summary_df.attrs['consolidation'] lists the uploads used, and the ones
+    whose names were matched under an older mapping generation (stale).
+    """
+    filters = source_filters(since, until, upload_hashes)
+    brand = db.func.coalesce(BrandMapping.reference_name, UploadFact.brand)
+    keys = [brand, UploadFact.product_name, UploadFact.price_band, UploadFact.category, UploadFact.origin]
+
+    def facts_query(*columns):
+        return (
+            db.select(*keys, *columns)
+            .select_from(UploadFact)
+            .join(UploadFactSource, UploadFactSource.upload_hash == UploadFact.upload_hash)
+            .outerjoin(BrandMapping, BrandMapping.brand_name == UploadFact.brand)
+            .where(*filters)
+        )
+
+    totals = db.session.execute(
+        facts_query(
+            db.func.sum(UploadFact.quantity), db.func.sum(UploadFact.total),
+            db.func.max(ProductMapping.box_weight), db.func.max(ProductMapping.box_size),
+        )
+        .outerjoin(ProductMapping, ProductMapping.product_name == UploadFact.product_name)
+        .group_by(*keys)
+    ).all()
+
+    # 型号 keeps first-seen order across uploads, which GROUP BY string
+    # aggregation can't guarantee on every backend, so it is folded here
+    models = {}
+    rows = db.session.execute(
+        facts_query(UploadFact.models).order_by(UploadFactSource.uploaded_at, UploadFact.id)
+    )
+    for *key, model_list in rows:
+        ordered = models.setdefault(tuple(key), {})
+        for model in json.loads(model_list or '[]'):
+            ordered.setdefault(model, None)
+
+    summary_df = pd.DataFrame(
+        [
+            (*key, ', '.join(models.get(tuple(key), ())), quantity, total, weight, size,
+             (weight or 0) * (quantity or 0))
+            for *key, quantity, total, weight, size in totals
+        ],
+        columns=SUMMARY_KEYS + ['型号', '数量', '总价格', '单件净重(kg)', '规格', '净重'],
+    )
+    summary_df['价格区间'] = pd.Categorical(summary_df['价格区间'], categories=PRICE_LABELS, ordered=True)
+    # Same group order as groupby(sort=True) in process_manufacturer_data
+    summary_df = summary_df.sort_values(SUMMARY_KEYS, ignore_index=True)
+    summary_df = finalize_summary(summary_df)
+
+    sources = db.session.execute(
+        db.select(UploadFactSource).where(*filters).order_by(UploadFactSource.uploaded_at)
+    ).scalars().all()
+    generation = match_generation(snapshot.versions) if snapshot.versions else None
+    summary_df.attrs['consolidation'] = {
+        'uploads': [s.to_dict() for s in sources],
+        'rows': sum(s.rows or 0 for s in sources),
+        'stale_uploads': [s.upload_hash for s in sources if generation and s.generation != generation],
+    }
+    return summary_df
@@ -2,79 +2,127 @@
 """
 Database Initialization on Startup
 Automatically populates database with default data if empty (for fresh PostgreSQL deployments)
+
+Seeding runs in-process as idempotent bulk operations inside one transaction.
+A single query decides whether anything needs seeding, and an advisory lock
+keeps concurrent gunicorn workers or instances from seeding at the same time.
 """
 
-from app import app
-from database import db, ProductMapping, BrandMapping, KnownProductName
-import subprocess
 import sys
-import os
+from sqlalchemy import insert, text
+from database import db, ProductMapping, BrandMapping, KnownProductName
+from mapping_bulk import upsert_brand_mappings, upsert_known_names
+from upload_catalog import catalog_paths
+from seed_data import BRAND_MAPPINGS, KNOWN_NAMES
+
+# Arbitrary constant identifying the seeding lock in pg_advisory_xact_lock
+SEED_LOCK_KEY = 0x5EED0001
+
+EMPTY_TABLES_QUERY = text("""
+    SELECT
+        NOT EXISTS (SELECT 1 FROM product_mapping) AS products_empty,
+        NOT EXISTS (SELECT 1 FROM brand_mapping) AS brands_empty,
+        NOT EXISTS (SELECT 1 FROM known_product_names) AS known_empty
+""")
+
+
+def empty_tables():
+    """Return (products_empty, brands_empty, known_empty) in one round trip."""
+    return tuple(bool(v) for v in db.session.execute(EMPTY_TABLES_QUERY).one())
+
+
+def acquire_seed_lock():
+    """
+    Serialize seeding across processes for the rest of the current transaction.
+    PostgreSQL uses a transaction-level advisory lock; SQLite takes its write lock up front.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SEED_LOCK_KEY})
+    elif dialect == 'sqlite':
+        db.session.execute(text('BEGIN IMMEDIATE'))
+
+
+def seed_database_if_empty(uploads_dir='uploads'):
+    """
+    Seed any empty mapping table. Must run inside an app context.
+
+    Returns:
+        dict of rows added per table, or None if nothing needed seeding
+    """
+    # Fast path: a populated database costs one query and takes no lock
+    if not any(empty_tables()):
+        db.session.rollback()
+        return None
+    db.session.rollback()
+
+    try:
+        acquire_seed_lock()
+        # Re-check under the lock: another worker may have seeded meanwhile
+        products_empty, brands_empty, known_empty = empty_tables()
+        added = {}
+
+        if brands_empty:
+            rows = [{'brand_name': b, 'reference_name': r} for b, r in BRAND_MAPPINGS.items()]
+            added['brands'] = upsert_brand_mappings(rows, commit=False)['created']
+
+        if known_empty:
+            rows = [{'product_name': name} for name in KNOWN_NAMES]
+            added['known_names'] = upsert_known_names(rows, commit=False)['created']
+
+        if products_empty:
+            # Catalog updates stay in this transaction (and under the seed lock)
+            source_files = catalog_paths(uploads_dir, ['mapping_source'], commit=False)
+            if source_files:
+                # Imported lazily: pandas is only needed when rebuilding from Excel
+                from rebuild_product_mapping import load_source_products, product_records
+
+                products = load_source_products(source_files)['products']
+                records = product_records(products)
+                if records:
+                    db.session.execute(insert(ProductMapping), records)
+                added['products'] = len(records)
+            else:
+                added['products'] = 0
+
+        db.session.commit()
+        return added
+    except Exception:
+        db.session.rollback()
+        raise
+
 
 def init_database_if_empty():
     """
     Check if database is empty and initialize with default data if needed.
     This is crucial for PostgreSQL deployments where the database starts empty.
     """
+    from app import app
+
     with app.app_context():
         try:
-            # Check if tables exist and have data
-            product_count = ProductMapping.query.count()
-            brand_count = BrandMapping.query.count()
-            known_count = KnownProductName.query.count()
-
-            print(f"📊 Current database state:")
-            print(f"   - Products: {product_count}")
-            print(f"   - Brands: {brand_count}")
-            print(f"   - Known Names: {known_count}")
-
-            # Initialize if database is empty
-            if product_count == 0 or brand_count == 0 or known_count == 0:
-                print("\n⚠️  Database is empty or incomplete, initializing...")
-
-                # Initialize brand mappings
-                if brand_count == 0:
-                    print("   → Initializing brand mappings...")
-                    result = subprocess.run(['python', 'init_brand_mapping.py'],
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        print("   ✅ Brand mappings initialized")
-                    else:
-                        print(f"   ❌ Error: {result.stderr}")
-
-                # Initialize known product names
-                if known_count == 0:
-                    print("   → Initializing known product names...")
-                    result = subprocess.run(['python', 'init_known_names.py'],
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        print("   ✅ Known product names initialized")
-                    else:
-                        print(f"   ❌ Error: {result.stderr}")
-
-                # Initialize product mappings from Excel files (if uploads folder has files)
-                if product_count == 0 and os.path.exists('uploads') and os.listdir('uploads'):
-                    print("   → Rebuilding product mappings from Excel files...")
-                    result = subprocess.run(['python', 'rebuild_product_mapping.py'],
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        print("   ✅ Product mappings rebuilt")
-                    else:
-                        print(f"   ❌ Error: {result.stderr}")
-                elif product_count == 0:
-                    print("   ⚠️  No Excel files in uploads/ folder to rebuild product mappings")
+            print("📊 Checking database state...")
+            added = seed_database_if_empty()
 
-                # Final count
-                with app.app_context():
-                    final_product_count = ProductMapping.query.count()
-                    final_brand_count = BrandMapping.query.count()
-                    final_known_count = KnownProductName.query.count()
-
-                print(f"\n✅ Database initialization complete!")
-                print(f"   - Products: {final_product_count}")
-                print(f"   - Brands: {final_brand_count}")
-                print(f"   - Known Names: {final_known_count}")
-            else:
+            if added is None:
                 print("✅ Database already populated, no initialization needed")
+                return
+
+            print("\n⚠️  Database was empty or incomplete, initialized in one transaction:")
+            if 'brands' in added:
+                print(f"   ✅ Brand mappings added: {added['brands']}")
+            if 'known_names' in added:
+                print(f"   ✅ Known product names added: {added['known_names']}")
+            if 'products' in added:
+                if added['products']:
+                    print(f"   ✅ Product mappings rebuilt: {added['products']}")
+                else:
+                    print("   ⚠️  No Excel files in uploads/ folder to rebuild product mappings")
+
+            print(f"\n✅ Database initialization complete!")
+            print(f"   - Products: {ProductMapping.query.count()}")
+            print(f"   - Brands: {BrandMapping.query.count()}")
+            print(f"   - Known Names: {KnownProductName.query.count()}")
 
         except Exception as e:
             print(f"❌ Error during database initialization: {e}")
@@ -4,7 +4,8 @@ and populate the product_mapping database table.
 """
 import pandas as pd
 from app import app
-from database import db, ProductMapping
+from database import ProductMapping
+from mapping_bulk import fill_missing_product_mappings
 import os
 from glob import glob
 
@@ -37,68 +38,28 @@ def extract_and_populate_product_mapping(excel_files):
     # Combine all product data
     combined_df = pd.concat(all_products, ignore_index=True)
 
+    # Normalize before grouping so names differing only by padding collapse together
+    combined_df['品名'] = combined_df['品名'].astype(str).str.strip()
+    combined_df['箱重量'] = pd.to_numeric(combined_df['箱重量'], errors='coerce')
+    combined_df['箱尺寸'] = combined_df['箱尺寸'].where(
+        combined_df['箱尺寸'].isna(), combined_df['箱尺寸'].astype(str).str.strip()
+    )
+
     # Group by product name and take the first non-null weight/size for each product
     # This handles cases where the same product might appear multiple times
-    unique_products = combined_df.groupby('品名').agg({
-        '箱重量': lambda x: x.dropna().iloc[0] if not x.dropna().empty else None,
-        '箱尺寸': lambda x: x.dropna().iloc[0] if not x.dropna().empty else None
-    }).reset_index()
+    unique_products = combined_df.groupby('品名', sort=False)[['箱重量', '箱尺寸']].first().reset_index()
+    unique_products.columns = ['product_name', 'box_weight', 'box_size']
 
     print(f"\nFound {len(unique_products)} unique products")
 
-    # Populate database
+    # Populate database: one existing-key query, one bulk insert, one bulk update
     with app.app_context():
-        added_count = 0
-        updated_count = 0
-        skipped_count = 0
-
-        for _, row in unique_products.iterrows():
-            product_name = str(row['品名']).strip()
-            box_weight = row['箱重量']
-            box_size = row['箱尺寸']
-
-            # Convert box_weight to float if possible
-            try:
-                box_weight = float(box_weight) if pd.notna(box_weight) else None
-            except (ValueError, TypeError):
-                box_weight = None
-
-            # Convert box_size to string if not null
-            box_size = str(box_size).strip() if pd.notna(box_size) else None
-
-            # Check if product already exists
-            existing = ProductMapping.query.filter_by(product_name=product_name).first()
-
-            if existing:
-                # Update if new data has values and existing doesn't
-                updated = False
-                if box_weight is not None and existing.box_weight is None:
-                    existing.box_weight = box_weight
-                    updated = True
-                if box_size is not None and existing.box_size is None:
-                    existing.box_size = box_size
-                    updated = True
-
-                if updated:
-                    updated_count += 1
-                else:
-                    skipped_count += 1
-            else:
-                # Add new product mapping
-                new_mapping = ProductMapping(
-                    product_name=product_name,
-                    box_weight=box_weight,
-                    box_size=box_size
-                )
-                db.session.add(new_mapping)
-                added_count += 1
-
-        db.session.commit()
+        counts = fill_missing_product_mappings(unique_products)
 
         print(f"\nResults:")
-        print(f"  - Added: {added_count} new products")
-        print(f"  - Updated: {updated_count} existing products")
-        print(f"  - Skipped: {skipped_count} (already complete)")
+        print(f"  - Added: {counts['added']} new products")
+        print(f"  - Updated: {counts['updated']} existing products")
+        print(f"  - Skipped: {counts['skipped']} (already complete)")
         print(f"\nTotal products in database: {ProductMapping.query.count()}")
 
 if __name__ == '__main__':
@@ -0,0 +1,282 @@
+# mapping_bulk.py
+"""
+Bulk upsert helpers for ProductMapping, BrandMapping and KnownProductName.
+
+Incoming rows are classified against the existing table with one key lookup,
+then written with a single INSERT ... ON CONFLICT statement (PostgreSQL and
+SQLite) inside one transaction.
+"""
+import os
+from datetime import datetime
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db, ProductMapping, BrandMapping, KnownProductName
+
+# Keys per IN (...) lookup; stays below SQLite's bound-parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+BULK_FILE_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+
+# Accepted column headers for uploaded files -> API field names
+PRODUCT_COLUMN_ALIASES = {
+    'product_name': 'product_name', '品名': 'product_name', '日文名字': 'product_name',
+    'box_weight': 'box_weight', '单件净重(kg)': 'box_weight', '箱重量': 'box_weight',
+    'box_size': 'box_size', '规格': 'box_size', '箱尺寸': 'box_size',
+}
+BRAND_COLUMN_ALIASES = {
+    'brand_name': 'brand_name', '品牌': 'brand_name',
+    'reference_name': 'reference_name', '标准品牌': 'reference_name',
+}
+KNOWN_NAME_COLUMN_ALIASES = {
+    'product_name': 'product_name', '品名': 'product_name', '日文名字': 'product_name',
+}
+
+
+def dialect_insert(table):
+    """Return a dialect-specific INSERT that supports ON CONFLICT."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Bulk upsert is not supported on '{dialect}'")
+
+
+def _chunks(items, size=LOOKUP_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def load_existing(model, key, columns, keys):
+    """Load {key: {column: value}} for the given keys with chunked IN lookups."""
+    key_col = getattr(model, key)
+    cols = [getattr(model, c) for c in columns]
+    existing = {}
+    for chunk in _chunks(list(keys)):
+        for row in db.session.execute(select(key_col, *cols).where(key_col.in_(chunk))):
+            existing[row[0]] = dict(zip(columns, row[1:]))
+    return existing
+
+
+def upsert_rows(model, key, value_columns, rows, commit=True):
+    """
+    Insert or update rows of `model` keyed by the unique column `key`.
+
+    A value column that is absent from a row keeps its stored value, so a
+    partial row only touches the fields it carries. Later rows win when the
+    same key appears twice.
+
+    Returns:
+        dict with created/updated/unchanged/total counts
+    """
+    merged = {}
+    for row in rows:
+        merged.setdefault(row[key], {}).update(row)
+
+    existing = load_existing(model, key, value_columns, merged.keys())
+
+    now = datetime.utcnow()
+    has_updated_at = 'updated_at' in model.__table__.c
+    to_write = []
+    created = updated = unchanged = 0
+
+    for name, row in merged.items():
+        current = existing.get(name)
+        if current is None:
+            values = {col: row.get(col) for col in value_columns}
+            created += 1
+        else:
+            values = {col: row[col] if col in row else current[col] for col in value_columns}
+            if values == current:
+                unchanged += 1
+                continue
+            updated += 1
+
+        record = {key: name, **values, 'created_at': now}
+        if has_updated_at:
+            record['updated_at'] = now
+        to_write.append(record)
+
+    if to_write:
+        stmt = dialect_insert(model.__table__)
+        update_columns = list(value_columns) + (['updated_at'] if has_updated_at else [])
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={col: stmt.excluded[col] for col in update_columns}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[key])
+        db.session.execute(stmt, to_write)
+
+    if commit:
+        db.session.commit()
+
+    return {
+        'created': created,
+        'updated': updated,
+        'unchanged': unchanged,
+        'total': len(merged),
+    }
+
+
+def fill_missing_product_mappings(products, commit=True):
+    """
+    Merge product weight/size data into ProductMapping, filling gaps only.
+
+    New products are inserted; existing products only get a weight or size
+    when they have none yet. Existing keys are loaded with one query and
+    the inserts/updates are computed as DataFrame operations, then applied
+    with one bulk insert and one bulk update.
+
+    Args:
+        products: DataFrame with columns product_name, box_weight, box_size
+                  (one row per product_name)
+
+    Returns:
+        dict with added/updated/skipped counts
+    """
+    import pandas as pd
+
+    existing = pd.DataFrame(
+        db.session.execute(select(
+            ProductMapping.id, ProductMapping.product_name,
+            ProductMapping.box_weight, ProductMapping.box_size
+        )).all(),
+        columns=['id', 'product_name', 'box_weight', 'box_size']
+    )
+
+    merged = products.merge(existing, on='product_name', how='left', suffixes=('', '_db'))
+    is_new = merged['id'].isna()
+
+    new_rows = merged.loc[is_new, ['product_name', 'box_weight', 'box_size']]
+
+    current = merged.loc[~is_new]
+    fill_weight = current['box_weight'].notna() & current['box_weight_db'].isna()
+    fill_size = current['box_size'].notna() & current['box_size_db'].isna()
+    changed = current[fill_weight | fill_size]
+    update_rows = pd.DataFrame({
+        'id': changed['id'].astype(int),
+        'box_weight': changed['box_weight_db'].fillna(changed['box_weight']),
+        'box_size': changed['box_size_db'].fillna(changed['box_size']),
+    })
+
+    def records(df):
+        return df.astype(object).where(df.notna(), None).to_dict('records')
+
+    if len(new_rows):
+        db.session.execute(insert(ProductMapping), records(new_rows))
+    if len(update_rows):
+        db.session.execute(update(ProductMapping), records(update_rows))
+
+    if commit:
+        db.session.commit()
+
+    return {
+        'added': len(new_rows),
+        'updated': len(update_rows),
+        'skipped': len(current) - len(update_rows),
+    }
+
+
+def _clean_text(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def clean_product_rows(items):
+    """Validate product mapping items. Returns (rows, errors)."""
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'row': index, 'error': 'Expected an object'})
+            continue
+        product_name = _clean_text(item.get('product_name'))
+        if not product_name:
+            errors.append({'row': index, 'error': 'product_name is required'})
+            continue
+        row = {'product_name': product_name}
+        if 'box_weight' in item:
+            try:
+                weight = item['box_weight']
+                row['box_weight'] = float(weight) if weight not in (None, '') else None
+            except (ValueError, TypeError):
+                errors.append({'row': index, 'error': 'Invalid box_weight format'})
+                continue
+        if 'box_size' in item:
+            row['box_size'] = _clean_text(item['box_size'])
+        rows.append(row)
+    return rows, errors
+
+
+def clean_brand_rows(items):
+    """Validate brand mapping items. Returns (rows, errors)."""
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'row': index, 'error': 'Expected an object'})
+            continue
+        brand_name = _clean_text(item.get('brand_name'))
+        reference_name = _clean_text(item.get('reference_name'))
+        if not brand_name or not reference_name:
+            errors.append({'row': index, 'error': 'brand_name and reference_name are required'})
+            continue
+        rows.append({'brand_name': brand_name, 'reference_name': reference_name})
+    return rows, errors
+
+
+def clean_known_name_rows(items):
+    """Validate known product name items (objects or plain strings). Returns (rows, errors)."""
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        value = item.get('product_name') if isinstance(item, dict) else item
+        product_name = _clean_text(value) if isinstance(value, str) else None
+        if not product_name:
+            errors.append({'row': index, 'error': 'product_name is required'})
+            continue
+        rows.append({'product_name': product_name})
+    return rows, errors
+
+
+def upsert_product_mappings(rows, commit=True):
+    return upsert_rows(ProductMapping, 'product_name', ['box_weight', 'box_size'], rows, commit)
+
+
+def upsert_brand_mappings(rows, commit=True):
+    return upsert_rows(BrandMapping, 'brand_name', ['reference_name'], rows, commit)
+
+
+def upsert_known_names(rows, commit=True):
+    return upsert_rows(KnownProductName, 'product_name', [], rows, commit)
+
+
+def read_rows_from_file(file_storage, column_aliases):
+    """
+    Read an uploaded CSV/XLSX file into a list of dicts keyed by API field names.
+
+    Blank cells are left out of the row, so they never overwrite stored values.
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(file_storage.filename or '')[1].lower().lstrip('.')
+    if extension not in BULK_FILE_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {file_storage.filename}")
+
+    if extension == 'csv':
+        df = pd.read_csv(file_storage.stream, dtype=object)
+    else:
+        df = pd.read_excel(file_storage.stream, dtype=object)
+
+    # Keep the first source column for each API field
+    selected = {}
+    for column in df.columns:
+        field = column_aliases.get(str(column).strip())
+        if field and field not in selected:
+            selected[field] = column
+    df = df[list(selected.values())]
+    df.columns = list(selected.keys())
+
+    records = df.to_dict('records')
+    return [{k: v for k, v in record.items() if pd.notna(v)} for record in records]
@@ -0,0 +1,108 @@
+# mapping_export.py
+"""
+Streaming export of the mapping tables as CSV, JSONL or XLSX.
+
+Rows are fetched as plain tuples in chunks through a server-side cursor
+(yield_per), so memory stays flat regardless of table size and no ORM
+objects are built.
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from database import db, ProductMapping, BrandMapping, KnownProductName
+
+EXPORT_CHUNK_SIZE = 1000
+
+# Full Content-Type values (with charset), sent as they are
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+EXPORT_TABLES = {
+    'product_mappings': (ProductMapping, ['product_name', 'box_weight', 'box_size', 'created_at', 'updated_at']),
+    'brand_mappings': (BrandMapping, ['brand_name', 'reference_name', 'created_at', 'updated_at']),
+    'known_product_names': (KnownProductName, ['product_name', 'created_at']),
+}
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_row_chunks(model, columns):
+    """Yield lists of row tuples, EXPORT_CHUNK_SIZE at a time, in id order."""
+    stmt = (
+        db.select(*[getattr(model, c) for c in columns])
+        .order_by(model.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for partition in db.session.execute(stmt).partitions():
+        yield [tuple(_value(v) for v in row) for row in partition]
+
+
+def iter_csv(model, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the UTF-8 Japanese/Chinese text correctly
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for rows in iter_row_chunks(model, columns):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_jsonl(model, columns):
+    for rows in iter_row_chunks(model, columns):
+        yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def iter_xlsx(model, columns, read_size=64 * 1024):
+    """
+    XLSX is a zip archive and can't be emitted row by row, so rows are
+    written to a temporary file with xlsxwriter's constant_memory mode and
+    the file is streamed once complete.
+    """
+    import xlsxwriter
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, columns)
+        row_index = 1
+        for rows in iter_row_chunks(model, columns):
+            for row in rows:
+                worksheet.write_row(row_index, 0, row)
+                row_index += 1
+        workbook.close()
+
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(read_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_stream(table_key, export_format):
+    """Return a generator producing the export body for the given table and format."""
+    model, columns = EXPORT_TABLES[table_key]
+    if export_format == 'csv':
+        return iter_csv(model, columns)
+    if export_format == 'jsonl':
+        return iter_jsonl(model, columns)
+    if export_format == 'xlsx':
+        return iter_xlsx(model, columns)
+    raise ValueError(f"Unsupported export format: {export_format}")
@@ -0,0 +1,384 @@
+# name_matcher.py
+"""
+In-memory 品名 canonicalization shared by the report pipeline and the
+name resolution API.
+
+NameMatcher replaces the giant '(?i)(name1|name2|...)' alternation regex:
+known names are indexed by their first two case-folded characters, so each
+position of an input string only checks the few name lengths that can
+start there. Before any substring search, names are looked up by their
+normalized key (normalize_name), which the mapping tables store
+precomputed in their name_key column. MappingSnapshot bundles both with
+the brand and weight/size lookups, and get_snapshot() caches one per
+process until the mapping tables change.
+"""
+import re
+import threading
+import unicodedata
+from datetime import datetime
+from seed_data import BRAND_MAPPINGS, KNOWN_NAMES
+
+# Tables whose contents a MappingSnapshot is built from
+SNAPSHOT_TABLES = ['product_mapping', 'brand_mapping', 'known_product_names']
+
+# Bump when NameMatcher's matching rules change so memoized matches are recomputed
+MATCHER_VERSION = 3
+
+# Bump when normalize_name() changes. Also bump database.SCHEMA_VERSION so
+# workers recompute the stored name_key columns on their next boot.
+NORMALIZATION_VERSION = 1
+
+_WHITESPACE = re.compile(r'\s+')
+
+# Bump when MappingSnapshot.to_payload() changes shape
+SNAPSHOT_FORMAT = 1
+
+# Raw names per IN (...) lookup against name_match_memo
+MEMO_CHUNK_SIZE = 500
+
+# Longest raw name the memo stores (NameMatchMemo.raw_name length)
+MEMO_MAX_NAME_LENGTH = 255
+
+
+def normalize_name(name):
+    """
+    Normalized lookup key for a product name: NFKC (full-width → half-width,
+    ideographic space → space), lowercase, whitespace runs collapsed to one
+    space, trimmed. Returns None for anything that isn't a non-empty string.
+    """
+    if not isinstance(name, str):
+        return None
+    key = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', name).lower()).strip()
+    return key or None
+
+
+def fold_case(text):
+    """Lowercase for case-insensitive matching, keeping string positions aligned."""
+    folded = text.lower()
+    if len(folded) != len(text):
+        # A few characters lowercase to two code points (e.g. 'İ'); keep those as-is
+        folded = ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+    return folded
+
+
+class NameMatcher:
+    """
+    Case-insensitive substring matcher over a fixed set of names.
+
+    match() returns the known name found leftmost in the text, preferring
+    the longest name when several start at the same position, in its stored
+    spelling. Returns None when nothing matches.
+    """
+
+    def __init__(self, names):
+        self._names = {}          # folded name -> canonical spelling
+        self._lengths = {}        # folded 2-char prefix -> name lengths, longest first
+        self._single_chars = {}   # folded 1-char name -> canonical spelling
+
+        for name in sorted(n for n in names if n):
+            folded = fold_case(name)
+            if len(folded) == 1:
+                self._single_chars.setdefault(folded, name)
+                continue
+            if folded in self._names:
+                continue
+            self._names[folded] = name
+            self._lengths.setdefault(folded[:2], set()).add(len(folded))
+
+        self._lengths = {prefix: sorted(lengths, reverse=True) for prefix, lengths in self._lengths.items()}
+
+    def __len__(self):
+        return len(self._names) + len(self._single_chars)
+
+    def match(self, text):
+        if not isinstance(text, str):
+            return None
+        folded = fold_case(text)
+        names = self._names
+        lengths_by_prefix = self._lengths
+        single_chars = self._single_chars
+        end = len(folded)
+
+        for i in range(end):
+            lengths = lengths_by_prefix.get(folded[i:i + 2])
+            if lengths:
+                for length in lengths:
+                    if i + length <= end:
+                        canonical = names.get(folded[i:i + length])
+                        if canonical is not None:
+                            return canonical
+            if single_chars:
+                canonical = single_chars.get(folded[i])
+                if canonical is not None:
+                    return canonical
+        return None
+
+    def match_many(self, texts):
+        return [self.match(t) for t in texts]
+
+
+class MappingSnapshot:
+    """
+    Immutable view of the mapping tables used to resolve raw supplier rows:
+    品名 canonicalization, brand normalization and box weight/size lookup.
+    """
+
+    def __init__(self, known_names, product_mappings, brand_mappings, versions=None, name_keys=None):
+        self.known_names = list(known_names)
+        self.product_mappings = product_mappings    # product_name -> {'weight', 'size'}
+        self.brand_mappings = brand_mappings        # brand_name -> reference_name
+        self.versions = versions
+
+        names = set(self.known_names) | set(product_mappings)
+        self.matcher = NameMatcher(names)
+
+        # normalized key -> canonical name; name_keys holds the keys stored in
+        # the mapping tables, anything missing there is normalized here. When
+        # spellings share a key, a ProductMapping name wins, so the canonical
+        # name is the one that carries weight and size
+        name_keys = name_keys or {}
+        keys = {name: name_keys.get(name) or normalize_name(name) for name in names}
+        self.exact_names = {}
+        for name in sorted(names, key=lambda n: (n not in product_mappings, n)):
+            if keys[name] is not None:
+                self.exact_names.setdefault(keys[name], name)
+        # Any known spelling -> the canonical name of its key, so substring
+        # hits canonicalize exactly like exact hits
+        self.preferred_names = {name: self.exact_names[key] for name, key in keys.items() if key is not None}
+
+        self._suggestion_index = None
+
+    def to_payload(self):
+        """
+        JSON-serializable form of the snapshot for offline use (report_cli).
+        Name keys are not included; from_payload() recomputes them.
+        """
+        return {
+            'format': SNAPSHOT_FORMAT,
+            'normalization_version': NORMALIZATION_VERSION,
+            'versions': self.versions,
+            'known_names': self.known_names,
+            'brand_mappings': self.brand_mappings,
+            # name -> [weight, size] keeps the file small
+            'product_mappings': {name: [m['weight'], m['size']] for name, m in self.product_mappings.items()},
+        }
+
+    @classmethod
+    def from_payload(cls, payload):
+        """
+        Rebuild a snapshot written by to_payload(). It carries no table
+        versions, so matching never touches the database (no match memo).
+        """
+        if payload.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {payload.get('format')}")
+        product_mappings = {name: {'weight': weight, 'size': size}
+                            for name, (weight, size) in payload['product_mappings'].items()}
+        return cls(payload['known_names'], product_mappings, payload['brand_mappings'])
+
+    def match(self, raw_name):
+        """
+        Return (canonical name, match type) for a raw name. The match type is
+        'exact' for a normalized-key hit, 'substring' for a matcher hit, and
+        None (with a None name) when nothing matches.
+        """
+        canonical = self.exact_names.get(normalize_name(raw_name))
+        if canonical is not None:
+            return canonical, 'exact'
+        canonical = self.matcher.match(raw_name)
+        if canonical is None:
+            return None, None
+        return self.preferred_names.get(canonical, canonical), 'substring'
+
+    def canonical_name(self, raw_name):
+        """Canonical 品名 for a raw name, or the raw name itself when nothing matches."""
+        matched, _ = self.match(raw_name)
+        return matched if matched is not None else raw_name
+
+    def suggestion_index(self):
+        """Bigram index over the ProductMapping names for fuzzy suggestions, built on first use."""
+        if self._suggestion_index is None:
+            # Imported lazily: numpy is only needed once suggestions are requested
+            from name_suggest import SuggestionIndex
+            self._suggestion_index = SuggestionIndex(self.product_mappings)
+        return self._suggestion_index
+
+    def reference_brand(self, brand):
+        return self.brand_mappings.get(brand, brand)
+
+    def weight(self, product_name):
+        mapping = self.product_mappings.get(product_name)
+        return mapping['weight'] if mapping else None
+
+    def size(self, product_name):
+        mapping = self.product_mappings.get(product_name)
+        return mapping['size'] if mapping else None
+
+    def resolve(self, name, brand=None):
+        """Resolve one raw (品名, 品牌) pair."""
+        matched, match_type = self.match(name)
+        canonical = matched if matched is not None else name
+        mapping = self.product_mappings.get(canonical) or {}
+        return {
+            'name': name,
+            'canonical_name': canonical,
+            'matched': matched is not None,
+            'match_type': match_type,
+            'brand': brand,
+            'reference_brand': self.reference_brand(brand) if brand is not None else None,
+            'box_weight': mapping.get('weight'),
+            'box_size': mapping.get('size'),
+        }
+
+
+def load_product_mappings_from_db():
+    """Load product weight/size mappings from database"""
+    try:
+        from database import db, ProductMapping
+        rows = db.session.execute(db.select(
+            ProductMapping.product_name, ProductMapping.box_weight, ProductMapping.box_size
+        ))
+        return {name: {'weight': weight, 'size': size} for name, weight, size in rows}
+    except Exception as e:
+        print(f"Warning: Could not load product mappings from database: {e}")
+        return {}
+
+
+def load_brand_mappings_from_db():
+    """Load brand mappings from database"""
+    try:
+        from database import db, BrandMapping
+        rows = db.session.execute(db.select(BrandMapping.brand_name, BrandMapping.reference_name))
+        return {brand: reference for brand, reference in rows}
+    except Exception as e:
+        print(f"Warning: Could not load brand mappings from database: {e}")
+        # Fallback to the seed values if database is not available
+        return dict(BRAND_MAPPINGS)
+
+
+def load_known_names_from_db():
+    """Load known product names from database"""
+    try:
+        from database import db, KnownProductName
+        return list(db.session.execute(db.select(KnownProductName.product_name)).scalars())
+    except Exception as e:
+        print(f"Warning: Could not load known names from database: {e}")
+        # Fallback to the seed values if database is not available
+        return list(KNOWN_NAMES)
+
+
+def load_name_keys_from_db():
+    """Load the stored normalized keys of all product and known names"""
+    try:
+        from database import db, ProductMapping, KnownProductName
+        name_keys = {}
+        for model in (ProductMapping, KnownProductName):
+            name_keys.update(db.session.execute(db.select(model.product_name, model.name_key)).tuples().all())
+        return name_keys
+    except Exception as e:
+        print(f"Warning: Could not load name keys from database: {e}")
+        return {}
+
+
+def build_snapshot_from_db(versions=None):
+    return MappingSnapshot(
+        load_known_names_from_db(),
+        load_product_mappings_from_db(),
+        load_brand_mappings_from_db(),
+        versions=versions,
+        name_keys=load_name_keys_from_db(),
+    )
+
+
+def match_generation(versions):
+    """Memo generation key: changes whenever the names the matcher is built from change."""
+    return (f"m{MATCHER_VERSION}.n{NORMALIZATION_VERSION}"
+            f".k{versions['known_product_names']}.p{versions['product_mapping']}")
+
+
+def canonical_names_memoized(snapshot, raw_names):
+    """
+    Canonical 品名 for each raw name, like snapshot.canonical_name().
+
+    Raw names already resolved under the current mapping generation are read
+    from name_match_memo with bulk lookups; only new strings go through the
+    matcher, and their results are written back. Falls back to the matcher
+    alone when the snapshot has no versions or the memo is unavailable.
+
+    Returns:
+        (list of canonical names, number of memo hits)
+    """
+    raw_names = list(raw_names)
+    if snapshot.versions is None:
+        return [snapshot.canonical_name(name) for name in raw_names], 0
+
+    from sqlalchemy import delete
+    from database import db, NameMatchMemo
+    from mapping_bulk import dialect_insert
+
+    generation = match_generation(snapshot.versions)
+    # Sorted so concurrent reports upsert (and row-lock) overlapping names in
+    # the same order; unordered batches can deadlock each other on PostgreSQL
+    memo_keys = sorted({n for n in raw_names if isinstance(n, str) and len(n) <= MEMO_MAX_NAME_LENGTH})
+
+    try:
+        memo = {}
+        for start in range(0, len(memo_keys), MEMO_CHUNK_SIZE):
+            chunk = memo_keys[start:start + MEMO_CHUNK_SIZE]
+            rows = db.session.execute(
+                db.select(NameMatchMemo.raw_name, NameMatchMemo.canonical_name)
+                .where(NameMatchMemo.raw_name.in_(chunk), NameMatchMemo.generation == generation)
+            )
+            for raw_name, canonical_name in rows:
+                memo[raw_name] = canonical_name
+
+        misses = [n for n in memo_keys if n not in memo]
+        if misses:
+            resolved = {n: snapshot.canonical_name(n) for n in misses}
+            stmt = dialect_insert(NameMatchMemo.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['raw_name'],
+                set_={'canonical_name': stmt.excluded.canonical_name, 'generation': stmt.excluded.generation}
+            )
+            now = datetime.utcnow()
+            db.session.execute(stmt, [
+                {'raw_name': n, 'canonical_name': c, 'generation': generation, 'created_at': now}
+                for n, c in resolved.items()
+            ])
+            # Entries from older generations can never be hit again
+            db.session.execute(delete(NameMatchMemo).where(NameMatchMemo.generation != generation))
+            db.session.commit()
+            memo.update(resolved)
+        hits = len(memo_keys) - len(misses)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Warning: Could not use the name match memo: {e}")
+        return [snapshot.canonical_name(name) for name in raw_names], 0
+
+    return [memo[n] if n in memo else snapshot.canonical_name(n) for n in raw_names], hits
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Return the process-wide MappingSnapshot, rebuilding it only when the
+    mapping tables' change counters have moved. Must run in an app context.
+    """
+    global _snapshot
+    try:
+        from database import get_table_versions
+        versions = get_table_versions(SNAPSHOT_TABLES)
+    except Exception as e:
+        print(f"Warning: Could not read mapping table versions: {e}")
+        return build_snapshot_from_db()
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.versions == versions:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot.versions != versions:
+            _snapshot = build_snapshot_from_db(versions)
+        return _snapshot
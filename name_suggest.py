@@ -0,0 +1,84 @@
+# name_suggest.py
+"""
+Fuzzy candidate search for product names that match no mapping.
+
+SuggestionIndex is a character-bigram inverted index over ProductMapping
+names (on their normalized keys). A query only touches the postings of its
+own bigrams, and candidates are scored with the Dice coefficient
+2 * shared / (query bigrams + candidate bigrams), so a batch never compares
+names pairwise against the whole catalog.
+"""
+import numpy as np
+from name_matcher import normalize_name
+
+DEFAULT_SUGGESTION_LIMIT = 5
+DEFAULT_MIN_SCORE = 0.3
+
+
+def name_bigrams(key):
+    """Distinct character bigrams of a normalized key (the key itself if shorter)."""
+    if len(key) < 2:
+        return {key}
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+class SuggestionIndex:
+    """Character-bigram inverted index over a fixed list of names."""
+
+    def __init__(self, names):
+        self.names = []
+        gram_ids = {}
+        postings = []       # per gram id: list of name indexes
+        sizes = []
+
+        for name in names:
+            key = normalize_name(name)
+            if key is None:
+                continue
+            index = len(self.names)
+            self.names.append(name)
+            grams = name_bigrams(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                gram_id = gram_ids.get(gram)
+                if gram_id is None:
+                    gram_id = gram_ids[gram] = len(postings)
+                    postings.append([])
+                postings[gram_id].append(index)
+
+        # CSR layout: the postings of gram g are flat[offsets[g]:offsets[g + 1]]
+        self._gram_ids = gram_ids
+        self._sizes = np.asarray(sizes, dtype=np.float32)
+        lengths = np.fromiter((len(p) for p in postings), dtype=np.int64, count=len(postings))
+        self._offsets = np.concatenate(([0], np.cumsum(lengths)))
+        self._flat = (np.fromiter((i for p in postings for i in p), dtype=np.int32, count=int(lengths.sum()))
+                      if postings else np.empty(0, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.names)
+
+    def suggest(self, name, limit=DEFAULT_SUGGESTION_LIMIT, min_score=DEFAULT_MIN_SCORE):
+        """Return up to `limit` (name, score) candidates for one name, best first."""
+        key = normalize_name(name)
+        if key is None or not self.names:
+            return []
+
+        grams = name_bigrams(key)
+        gram_ids = [self._gram_ids[g] for g in grams if g in self._gram_ids]
+        if not gram_ids:
+            return []
+
+        hits = np.concatenate([self._flat[self._offsets[g]:self._offsets[g + 1]] for g in gram_ids])
+        candidates, shared = np.unique(hits, return_counts=True)
+        scores = 2.0 * shared / (len(grams) + self._sizes[candidates])
+
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return [(self.names[candidates[i]], round(float(scores[i]), 3)) for i in order]
+
+    def suggest_many(self, names, limit=DEFAULT_SUGGESTION_LIMIT, min_score=DEFAULT_MIN_SCORE):
+        return [self.suggest(name, limit, min_score) for name in names]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Profile worker boot time.
+
+Each run starts a fresh interpreter, the way a gunicorn worker boots, and
+times `import app` in two modes:
+
+  before - the old boot path: pandas/numpy pulled in through data_processor
+           and report_generator, plus db.create_all() on every boot
+  after  - the current boot path: `import app` only (heavy modules load
+           lazily on the report path, schema check skipped when current)
+
+Usage:
+    python profile_startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+BEFORE_SNIPPET = """
+import time
+t = time.perf_counter()
+import data_processor, report_generator
+import app
+from database import db
+with app.app.app_context():
+    db.create_all()
+print(time.perf_counter() - t)
+"""
+
+AFTER_SNIPPET = """
+import time
+t = time.perf_counter()
+import app
+print(time.perf_counter() - t)
+"""
+
+IMPORT_ONLY_SNIPPET = "import app"
+
+
+def time_boot(snippet):
+    """Run snippet in a fresh interpreter and return the boot seconds it prints."""
+    result = subprocess.run(
+        [sys.executable, '-c', snippet],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def top_imports(count):
+    """Return the slowest imports made directly by `import app`, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_ONLY_SNIPPET],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line.split('|', 2)
+        # Nesting depth is encoded as two spaces per level after the separator space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile worker boot time before/after lazy imports')
+    parser.add_argument('--runs', type=int, default=5, help='worker boots to time per mode')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    args = parser.parse_args()
+
+    # Warm-up boot so schema setup and OS file caches don't skew the first run
+    time_boot(AFTER_SNIPPET)
+
+    print("=" * 70)
+    print(f"⏱️  WORKER BOOT TIME ({args.runs} runs each)")
+    print("=" * 70)
+    results = {}
+    for label, snippet in [('before', BEFORE_SNIPPET), ('after', AFTER_SNIPPET)]:
+        timings = [time_boot(snippet) for _ in range(args.runs)]
+        results[label] = timings
+        print(f"{label:>6}: " + "  ".join(f"{t * 1000:7.1f}ms" for t in timings))
+        print(f"        median {statistics.median(timings) * 1000:.1f}ms")
+
+    before = statistics.median(results['before'])
+    after = statistics.median(results['after'])
+    print(f"\n📉 Boot time per worker: {before * 1000:.1f}ms → {after * 1000:.1f}ms "
+          f"({(1 - after / before) * 100:.0f}% faster)")
+
+    print()
+    print("=" * 70)
+    print(f"📦 SLOWEST IMPORTS DURING `import app` (cumulative)")
+    print("=" * 70)
+    for cumulative_us, name in top_imports(args.top):
+        print(f"   {cumulative_us / 1000:8.1f}ms  {name}")
+
+if __name__ == '__main__':
+    main()
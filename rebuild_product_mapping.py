@@ -3,121 +3,213 @@
 Rebuild ProductMapping table from Excel files.
 Reads columns: 日文名字, 规格, 单件净重(kg)
 Maps to: product_name, box_size, box_weight
+
+Source files are read in parallel and deduplicated in one vectorized pass
+(first file wins). The result is bulk-loaded into a staging table and then
+swapped into product_mapping in one short transaction, so live report
+requests never see an empty or partially rebuilt table.
 """
 
-import pandas as pd
 import os
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import MetaData, insert, select, text
 from database import db, ProductMapping
-from app import app
+from workbook_reader import read_workbooks
+from upload_catalog import catalog_paths
+
+REQUIRED_COLS = ['日文名字', '规格', '单件净重(kg)']
+STAGING_TABLE = 'product_mapping_staging'
+
+
+def list_source_files(uploads_dir='uploads', commit=True):
+    """
+    Return the mapping source workbooks in uploads_dir in the order they are
+    processed. Files are picked by their upload catalog schema, so
+    manufacturer files are never opened. Must run in an app context.
+    """
+    return catalog_paths(uploads_dir, ['mapping_source'], commit=commit)
+
+
+def load_source_products(file_paths):
+    """
+    Read all source workbooks and dedupe their products.
+
+    Returns:
+        dict with:
+          products    - DataFrame [product_name, box_size, box_weight, source_file], first file wins
+          duplicates  - DataFrame of ignored rows with the file that was kept
+          file_stats  - list of (filename, created, duplicates) for files that were read
+          skipped     - list of (filename, missing columns list or error message)
+          total_rows  - rows with a product name across all read files
+          invalid_weights - DataFrame [product_name, weight, source_file] of kept
+                        products whose weight is not a number (stored as empty)
+    """
+    frames = []
+    skipped = []
+    read_files = []
+
+    for path, df, missing, error in read_workbooks(file_paths, REQUIRED_COLS):
+        filename = os.path.basename(path)
+        if error:
+            skipped.append((filename, error))
+        elif missing:
+            skipped.append((filename, missing))
+        else:
+            read_files.append(filename)
+            frames.append(df[REQUIRED_COLS].assign(source_file=filename))
+
+    columns = ['product_name', 'box_size', 'box_weight', 'source_file']
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+    else:
+        combined = pd.DataFrame(columns=REQUIRED_COLS + ['source_file'])
+    combined = combined.dropna(subset=['日文名字'])
+    total_rows = len(combined)
+
+    raw_size = combined['规格']
+    raw_weight = combined['单件净重(kg)']
+    rows = pd.DataFrame({
+        'product_name': combined['日文名字'].astype(str).str.strip(),
+        'box_size': raw_size.where(raw_size.isna(), raw_size.astype(str).str.strip()),
+        'box_weight': pd.to_numeric(raw_weight, errors='coerce'),
+        'raw_weight': raw_weight,
+        'source_file': combined['source_file'],
+    })
+
+    # Skip rows where both size and weight cells are empty. An empty-string
+    # size or a zero weight still counts as present here; they are only
+    # stored as NULL below
+    rows = rows[raw_size.notna() | raw_weight.notna()]
+
+    # Concatenation order is file order, so keep='first' means first file wins
+    is_duplicate = rows.duplicated(subset='product_name', keep='first')
+    products = rows[~is_duplicate]
+    invalid_weights = products.loc[products['raw_weight'].notna() & products['box_weight'].isna(),
+                                   ['product_name', 'raw_weight', 'source_file']]
+    # Empty sizes and zero weights carry no information
+    products = products.assign(
+        box_size=products['box_size'].mask(products['box_size'] == ''),
+        box_weight=products['box_weight'].where(products['box_weight'] != 0),
+    )
+    first_file = products.set_index('product_name')['source_file']
+    duplicates = rows[is_duplicate].drop(columns='raw_weight').assign(first_file=lambda d: d['product_name'].map(first_file))
+
+    created_by_file = products['source_file'].value_counts()
+    duplicates_by_file = duplicates['source_file'].value_counts()
+    file_stats = [
+        (filename, int(created_by_file.get(filename, 0)), int(duplicates_by_file.get(filename, 0)))
+        for filename in read_files
+    ]
+
+    return {
+        'products': products[columns].reset_index(drop=True),
+        'duplicates': duplicates.reset_index(drop=True),
+        'file_stats': file_stats,
+        'skipped': skipped,
+        'total_rows': total_rows,
+        'invalid_weights': invalid_weights.rename(columns={'raw_weight': 'weight'}).reset_index(drop=True),
+    }
+
+
+def product_records(products):
+    """Convert a products DataFrame into insert-ready dicts."""
+    now = datetime.utcnow()
+    products = products.astype(object).where(products.notna(), None)
+    return [
+        {
+            'product_name': name,
+            'box_size': size,
+            'box_weight': float(weight) if weight is not None else None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        for name, size, weight in zip(products['product_name'], products['box_size'], products['box_weight'])
+    ]
+
+
+def swap_in_products(products):
+    """
+    Replace the contents of product_mapping with `products`.
+
+    Rows are bulk-loaded into a staging table first; the swap itself is one
+    transaction (DELETE + INSERT ... SELECT), so readers see either the old
+    or the new table and never an empty one. Swapping contents rather than
+    renaming tables keeps product_mapping's indexes and sequences in place.
+    """
+    engine = db.engine
+    target = ProductMapping.__table__
+    staging = target.to_metadata(MetaData(), name=STAGING_TABLE)
+    # name_key is filled by its column default when rows land in the staging table
+    columns = ['product_name', 'name_key', 'box_size', 'box_weight', 'created_at', 'updated_at']
+
+    staging.drop(engine, checkfirst=True)
+    staging.create(engine)
+    try:
+        records = product_records(products)
+        if records:
+            with engine.begin() as conn:
+                conn.execute(insert(staging), records)
+
+        with engine.begin() as conn:
+            if engine.dialect.name == 'postgresql':
+                # Block concurrent writers (not readers) for the duration of the swap
+                conn.execute(text(f'LOCK TABLE {target.name} IN EXCLUSIVE MODE'))
+            conn.execute(target.delete())
+            conn.execute(insert(target).from_select(
+                columns, select(*[staging.c[c] for c in columns])
+            ))
+    finally:
+        staging.drop(engine, checkfirst=True)
+
 
 def rebuild_product_mapping():
-    """Clear and rebuild ProductMapping table from Excel files"""
+    """Rebuild ProductMapping table from Excel files without emptying it in between"""
+    from app import app
 
     with app.app_context():
-        # Clear existing data
-        print("🗑️  Clearing existing ProductMapping table...")
-        ProductMapping.query.delete()
-        db.session.commit()
-        print("   ✅ Table cleared\n")
-
         uploads_dir = 'uploads'
-        excel_files = sorted([f for f in os.listdir(uploads_dir) if f.endswith(('.xlsx', '.xls'))])
+        excel_files = list_source_files(uploads_dir)
 
         if not excel_files:
-            print("❌ No Excel files found in uploads/ directory")
+            print("❌ No mapping source files (日文名字, 规格, 单件净重(kg)) found in uploads/ directory")
             return
 
-        print(f"📂 Found {len(excel_files)} Excel files\n")
-
-        # Track statistics
-        total_files = 0
-        skipped_files = []
-        total_rows = 0
-        duplicates = []
-        created_count = 0
-
-        # Store all products to detect duplicates
-        seen_products = {}
-
-        for excel_file in excel_files:
-            file_path = os.path.join(uploads_dir, excel_file)
-
-            try:
-                print(f"📄 Processing: {excel_file}")
-                df = pd.read_excel(file_path)
-
-                # Check for required columns
-                required_cols = ['日文名字', '规格', '单件净重(kg)']
-                missing_cols = [col for col in required_cols if col not in df.columns]
-
-                if missing_cols:
-                    print(f"   ⚠️  Missing columns: {missing_cols}")
-                    print(f"   ❌ Skipping this file\n")
-                    skipped_files.append((excel_file, missing_cols))
-                    continue
-
-                # Extract relevant columns
-                data = df[required_cols].copy()
-
-                # Remove rows with missing product name
-                data = data.dropna(subset=['日文名字'])
-
-                # Process each row
-                file_created = 0
-                file_duplicates = 0
-
-                for _, row in data.iterrows():
-                    total_rows += 1
-
-                    product_name = str(row['日文名字']).strip()
-                    box_size = str(row['规格']).strip() if pd.notna(row['规格']) else None
-                    box_weight = float(row['单件净重(kg)']) if pd.notna(row['单件净重(kg)']) else None
-
-                    # Skip if both size and weight are None
-                    if box_size is None and box_weight is None:
-                        continue
-
-                    # Check for duplicates
-                    if product_name in seen_products:
-                        duplicates.append({
-                            'product_name': product_name,
-                            'first_file': seen_products[product_name],
-                            'duplicate_file': excel_file,
-                            'box_size': box_size,
-                            'box_weight': box_weight
-                        })
-                        file_duplicates += 1
-                        continue
-
-                    # Create new product mapping
-                    product = ProductMapping(
-                        product_name=product_name,
-                        box_size=box_size if box_size else None,
-                        box_weight=box_weight if box_weight else None
-                    )
-                    db.session.add(product)
-                    seen_products[product_name] = excel_file
-                    file_created += 1
-                    created_count += 1
-
-                db.session.commit()
-                print(f"   ✅ Created: {file_created}, Duplicates: {file_duplicates}\n")
-                total_files += 1
-
-            except Exception as e:
-                print(f"   ❌ Error: {str(e)}\n")
-                skipped_files.append((excel_file, str(e)))
-                continue
+        print(f"📂 Found {len(excel_files)} mapping source files, reading in parallel...\n")
+
+        result = load_source_products(excel_files)
+        products = result['products']
+        duplicates = result['duplicates']
+        skipped_files = result['skipped']
+
+        for filename, file_created, file_duplicates in result['file_stats']:
+            print(f"📄 Processed: {filename}")
+            print(f"   ✅ Created: {file_created}, Duplicates: {file_duplicates}\n")
+
+        for filename, reason in skipped_files:
+            print(f"📄 Processed: {filename}")
+            if isinstance(reason, list):
+                print(f"   ⚠️  Missing columns: {reason}")
+                print(f"   ❌ Skipping this file\n")
+            else:
+                print(f"   ❌ Error: {reason}\n")
+
+        print("🔄 Loading staging table and swapping into ProductMapping...")
+        swap_in_products(products)
+        print("   ✅ Swap complete\n")
 
         # Print summary
         print("=" * 70)
         print("📊 SUMMARY")
         print("=" * 70)
-        print(f"Total files processed: {total_files}")
+        print(f"Total files processed: {len(result['file_stats'])}")
         print(f"Total files skipped: {len(skipped_files)}")
-        print(f"Total rows examined: {total_rows}")
-        print(f"Products created: {created_count}")
+        print(f"Total rows examined: {result['total_rows']}")
+        print(f"Products created: {len(products)}")
         print(f"Duplicates found: {len(duplicates)}")
+        invalid_weights = result['invalid_weights']
+        if len(invalid_weights):
+            print(f"Non-numeric weights stored as empty: {len(invalid_weights)}")
 
         # Show skipped files
         if skipped_files:
@@ -128,15 +220,23 @@ def rebuild_product_mapping():
                 else:
                     print(f"   - {filename}: {reason}")
 
+        # Show non-numeric weights
+        if len(invalid_weights):
+            print(f"\n⚠️  Non-numeric Weights (product kept, weight left empty):")
+            for row in invalid_weights.head(20).itertuples(index=False):
+                print(f"   - {row.product_name}: {row.weight!r} ({row.source_file})")
+            if len(invalid_weights) > 20:
+                print(f"   ... and {len(invalid_weights) - 20} more")
+
         # Show duplicates
-        if duplicates:
+        if len(duplicates):
             print(f"\n🔁 Duplicate Products Report:")
             print(f"   (These products appeared in multiple files - first occurrence kept)")
             print()
-            for dup in duplicates[:20]:  # Show first 20
-                print(f"   Product: {dup['product_name']}")
-                print(f"     ✅ Kept from: {dup['first_file']}")
-                print(f"     ❌ Ignored from: {dup['duplicate_file']}")
+            for dup in duplicates.head(20).itertuples(index=False):  # Show first 20
+                print(f"   Product: {dup.product_name}")
+                print(f"     ✅ Kept from: {dup.first_file}")
+                print(f"     ❌ Ignored from: {dup.source_file}")
                 print()
 
             if len(duplicates) > 20:
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Offline board report builder for cron/batch runs.
+
+`build` produces the same summary workbook as /api/report/generate from a
+directory of manufacturer workbooks. It does not boot Flask or touch a
+database: mappings come from a snapshot file written by `export-snapshot`.
+That command is the only one that needs the database.
+
+Usage:
+    python report_cli.py export-snapshot mappings.json.gz
+    python report_cli.py build --snapshot mappings.json.gz uploads/ [--output-dir reports]
+        [--streaming] [--compact] [--workers N|auto] [--dedup flag|drop|off] [--include-suggestions]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# pandas, data_processor and the Flask app are imported inside the commands
+# that need them, so argument errors and --help return immediately
+
+
+def write_snapshot(payload, path):
+    """Write a snapshot payload as (gzipped, for .gz paths) JSON."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def read_snapshot(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_manufacturer_files(inputs):
+    """
+    Expand files and directories into manufacturer workbooks, by header sniffing.
+
+    Returns:
+        (paths, skipped list of (path, reason))
+    """
+    from upload_catalog import is_excel_file, sniff_workbook, detect_schema
+
+    candidates = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates.extend(os.path.join(item, f) for f in sorted(os.listdir(item)) if is_excel_file(f))
+        else:
+            candidates.append(item)
+
+    paths, skipped = [], []
+    for path in candidates:
+        try:
+            schema, missing = detect_schema(sniff_workbook(path)['columns'])
+        except Exception as e:
+            skipped.append((path, str(e)))
+            continue
+        if schema == 'manufacturer':
+            paths.append(path)
+        else:
+            skipped.append((path, schema or f"missing columns {', '.join(missing)}"))
+    return paths, skipped
+
+
+def export_snapshot(args):
+    from app import app
+    from name_matcher import get_snapshot
+
+    with app.app_context():
+        snapshot = get_snapshot()
+        payload = snapshot.to_payload()
+    payload['exported_at'] = datetime.utcnow().isoformat()
+    write_snapshot(payload, args.output)
+
+    print(f"💾 Snapshot written to {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+    print(f"   Known names: {len(payload['known_names'])}, product mappings: {len(payload['product_mappings'])}, "
+          f"brand mappings: {len(payload['brand_mappings'])}")
+    return 0
+
+
+def build_report(args):
+    started = time.perf_counter()
+    payload = read_snapshot(args.snapshot)
+
+    from name_matcher import MappingSnapshot
+    from data_processor import process_manufacturer_data
+    from report_generator import generate_summary_report
+
+    snapshot = MappingSnapshot.from_payload(payload)
+    paths, skipped = list_manufacturer_files(args.inputs)
+    for path, reason in skipped:
+        print(f"⚠️  Skipped {path}: {reason}")
+    if not paths:
+        print("❌ No manufacturer workbooks found", file=sys.stderr)
+        return 1
+    print(f"📚 Snapshot from {payload.get('exported_at', 'unknown date')}, "
+          f"ready in {time.perf_counter() - started:.2f}s; processing {len(paths)} files")
+
+    report_params = {'include_suggestions': args.include_suggestions}
+    mapping_config = {
+        'include_suggestions': args.include_suggestions,
+        'streaming': args.streaming,
+        'compact': args.compact,
+        'workers': args.workers,
+        'dedup': args.dedup,
+        'snapshot': snapshot,
+    }
+    summary_data = process_manufacturer_data(paths, mapping_config)
+    if summary_data.empty:
+        print("❌ No rows could be read from the input files", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    report_filename = generate_summary_report(summary_data, report_params, output_folder=args.output_dir)
+    print(f"✅ {len(summary_data)} summary rows written to {os.path.join(args.output_dir, report_filename)} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline board report builder')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export-snapshot', help='write the mapping tables to a snapshot file (needs the database)')
+    export.add_argument('output', help="snapshot path; gzipped when it ends in '.gz'")
+    export.set_defaults(run=export_snapshot)
+
+    build = commands.add_parser('build', help='build a board report from workbooks and a snapshot file')
+    build.add_argument('inputs', nargs='+', help='manufacturer workbooks or directories of them')
+    build.add_argument('--snapshot', required=True, help='file written by export-snapshot')
+    build.add_argument('--output-dir', default='reports', help='folder for the report (default: reports)')
+    build.add_argument('--streaming', action='store_true', help='bounded-memory chunked aggregation')
+    build.add_argument('--compact', action='store_true', help='categorical keys and narrow numerics')
+    build.add_argument('--workers', default=None, help="aggregation processes (number or 'auto')")
+    build.add_argument('--dedup', choices=['drop', 'flag', 'off'], default='flag',
+                       help='rows repeating a row of an earlier file (default: flag, count only)')
+    build.add_argument('--include-suggestions', action='store_true', help='add the Unmatched Suggestions sheet')
+    build.set_defaults(run=build_report)
+
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,18 +3,31 @@ import pandas as pd
 import os
 import config
 
-def generate_summary_report(summary_data: pd.DataFrame, report_params):
+def generate_summary_report(summary_data: pd.DataFrame, report_params, report_id=None, output_folder=None,
+                            progress=None):
     """
     Formats the aggregated data into a professional Excel file with structure.
+    The report_id, when given, goes into the filename so reports generated
+    in the same second (batch jobs) don't overwrite each other. Reports are
+    written to config.REPORT_FOLDER unless output_folder is given.
+    progress: optional callback, called as progress('writing', rows=...)
     """
-    report_filename = f"board_summary_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    output_path = os.path.join(config.REPORT_FOLDER, report_filename)
+    if progress is not None:
+        progress('writing', rows=len(summary_data))
+    timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+    report_filename = f"board_summary_{timestamp}_{report_id}.xlsx" if report_id else f"board_summary_{timestamp}.xlsx"
+    output_path = os.path.join(output_folder or config.REPORT_FOLDER, report_filename)
     
     # Use Pandas ExcelWriter to write to different sheets
     with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
         
         # 1. Write the main summary table to the first sheet
         summary_data.to_excel(writer, sheet_name='Board Summary KPIs', index=False)
+
+        # Optional: fuzzy ProductMapping candidates for names that matched nothing
+        suggestions = summary_data.attrs.get('unmatched_suggestions')
+        if report_params.get('include_suggestions') and suggestions is not None:
+            suggestions.to_excel(writer, sheet_name='Unmatched Suggestions', index=False)
         
         # 2. Add high-level commentary or charts (requires XlsxWriter manipulation)
         # workbook = writer.book
@@ -0,0 +1,101 @@
+# report_preview.py
+"""
+JSON preview of generated reports.
+
+When a report is written, its summary is also saved as compact JSON
+(columns + row lists, with totals and unmatched-product counts precomputed)
+under CACHE_FOLDER/previews. The preview endpoint pages through that file,
+so it never re-reads the xlsx or re-runs the pipeline. The last few parsed
+previews are kept in memory per process.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+import config
+
+PREVIEW_FOLDER = os.path.join(config.CACHE_FOLDER, 'previews')
+PREVIEW_CACHE_SIZE = 8
+DEFAULT_PREVIEW_ROWS = 50
+MAX_PREVIEW_ROWS = 500
+
+_previews = OrderedDict()   # (report_id, mtime_ns) -> parsed preview
+_previews_lock = threading.Lock()
+
+
+def _preview_path(report_id):
+    return os.path.join(PREVIEW_FOLDER, f'{report_id}.json')
+
+
+def summarize(summary_df):
+    """Totals and unmatched-product counts of a summary DataFrame."""
+    # A 品名 without a ProductMapping entry has neither weight nor size
+    unmatched = summary_df['单件净重(kg)'].isna() & summary_df['规格'].isna()
+    return {
+        'groups': int(len(summary_df)),
+        'quantity': float(summary_df['数量'].sum()),
+        'total_price': float(summary_df['总价格'].sum()),
+        'net_weight': float(summary_df['净重'].sum()),
+        'unmatched': {
+            'names': int(summary_df.loc[unmatched, '品名'].nunique()),
+            'groups': int(unmatched.sum()),
+            'quantity': float(summary_df.loc[unmatched, '数量'].sum()),
+        },
+    }
+
+
+def write_preview(report_id, summary_df, extra=None):
+    """Save the preview of a finished report. extra: more JSON fields (e.g. dedup_stats)."""
+    os.makedirs(PREVIEW_FOLDER, exist_ok=True)
+    # to_json handles NaN, numpy scalars and categoricals in one vectorized pass
+    table = json.loads(summary_df.to_json(orient='split', index=False, force_ascii=False))
+    payload = {
+        'report_id': report_id,
+        'columns': table['columns'],
+        'rows': table['data'],
+        'summary': summarize(summary_df) if len(summary_df) else None,
+        **(extra or {}),
+    }
+    tmp_path = _preview_path(report_id) + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, _preview_path(report_id))
+
+
+def load_preview(report_id):
+    """Parsed preview of a report, or None when none was saved."""
+    try:
+        mtime_ns = os.stat(_preview_path(report_id)).st_mtime_ns
+    except OSError:
+        return None
+
+    key = (report_id, mtime_ns)
+    with _previews_lock:
+        if key in _previews:
+            _previews.move_to_end(key)
+            return _previews[key]
+
+    with open(_preview_path(report_id), encoding='utf-8') as f:
+        preview = json.load(f)
+
+    with _previews_lock:
+        _previews[key] = preview
+        while len(_previews) > PREVIEW_CACHE_SIZE:
+            _previews.popitem(last=False)
+    return preview
+
+
+def preview_page(preview, page=1, per_page=DEFAULT_PREVIEW_ROWS):
+    """One page of preview rows plus the report-level summary."""
+    per_page = max(1, min(per_page, MAX_PREVIEW_ROWS))
+    page = max(1, page)
+    rows = preview['rows']
+    start = (page - 1) * per_page
+    return {
+        **{k: v for k, v in preview.items() if k != 'rows'},
+        'rows': rows[start:start + per_page],
+        'page': page,
+        'per_page': per_page,
+        'total': len(rows),
+        'pages': (len(rows) + per_page - 1) // per_page,
+    }
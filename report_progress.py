@@ -0,0 +1,147 @@
+# report_progress.py
+"""
+Live progress of report generation, streamed as Server-Sent Events.
+
+The pipeline reports its stages through a plain callback,
+progress(stage, **info) (mapping_config['progress'] in data_processor, the
+progress argument of generate_summary_report), so it depends neither on
+this module nor on Flask. run_report passes a ProgressTracker, which keeps
+the latest state of its report, estimates the remaining time and wakes the
+streams waiting on it.
+
+Trackers live in memory in the process that runs the report. A stream
+served by another process (several gunicorn workers) finds no tracker and
+falls back to the report's database status.
+"""
+import json
+import threading
+import time
+
+# Rough share of the run time each stage takes, used for percent and ETA
+STAGE_WEIGHTS = {'parsing': 0.6, 'matching': 0.15, 'aggregating': 0.15, 'writing': 0.1}
+STAGES = list(STAGE_WEIGHTS)
+FINAL_STAGES = ('done', 'error')
+
+# Finished trackers are kept this long for late subscribers
+FINISHED_TTL_SECONDS = 600
+# An idle stream sends a comment line this often so proxies keep it open
+KEEPALIVE_SECONDS = 10
+# Streams close after this long, within gunicorn's default 30s timeout;
+# EventSource reconnects on its own after RECONNECT_MS
+MAX_STREAM_SECONDS = 25
+RECONNECT_MS = 1000
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def progress_fraction(stage, info):
+    """Estimated share of the run done when `stage` reports `info` (0 to 1)."""
+    if stage in FINAL_STAGES:
+        return 1.0
+    if stage not in STAGE_WEIGHTS:
+        return 0.0
+    done = sum(STAGE_WEIGHTS[s] for s in STAGES[:STAGES.index(stage)])
+    # Parsing time follows file size; bytes_done and 'file' (1-based) count
+    # the files before the one being read
+    if info.get('bytes_total'):
+        done += STAGE_WEIGHTS[stage] * info.get('bytes_done', 0) / info['bytes_total']
+    elif info.get('files'):
+        done += STAGE_WEIGHTS[stage] * (info.get('file', 1) - 1) / info['files']
+    return done
+
+
+class ProgressTracker:
+    """Progress callback of one report: call it as progress(stage, **info)."""
+
+    def __init__(self, report_id):
+        self.report_id = report_id
+        self.started = time.monotonic()
+        self.finished_at = None
+        self.seq = 0
+        self.state = {'report_id': report_id, 'stage': 'queued', 'status': 'PENDING',
+                      'elapsed': 0.0, 'percent': 0, 'eta': None}
+        self.changed = threading.Condition()
+
+    def __call__(self, stage, **info):
+        elapsed = time.monotonic() - self.started
+        fraction = progress_fraction(stage, info)
+        # Too early for a meaningful estimate before 5% of the work is done
+        eta = elapsed * (1 - fraction) / fraction if 0.05 <= fraction < 1 else None
+        status = {'done': 'COMPLETE', 'error': 'ERROR'}.get(stage, 'PENDING')
+        with self.changed:
+            self.seq += 1
+            self.state = {
+                'report_id': self.report_id,
+                'stage': stage,
+                'status': status,
+                **info,
+                'elapsed': round(elapsed, 1),
+                'percent': round(fraction * 100),
+                'eta': round(eta, 1) if eta is not None else None,
+            }
+            if stage in FINAL_STAGES:
+                self.finished_at = time.monotonic()
+            self.changed.notify_all()
+
+    def wait(self, seq, timeout):
+        """(seq, state) as soon as the state moved past `seq`, or the current one after timeout."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.seq != seq, timeout)
+            return self.seq, dict(self.state)
+
+
+def start_tracking(report_id):
+    """Register and return a fresh tracker for a report."""
+    tracker = ProgressTracker(report_id)
+    now = time.monotonic()
+    with _trackers_lock:
+        for key in [k for k, t in _trackers.items()
+                    if t.finished_at is not None and now - t.finished_at > FINISHED_TTL_SECONDS]:
+            del _trackers[key]
+        _trackers[report_id] = tracker
+    return tracker
+
+
+def get_tracker(report_id):
+    with _trackers_lock:
+        return _trackers.get(report_id)
+
+
+def sse_event(event, data, event_id=None):
+    """One Server-Sent Events message with a JSON payload."""
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def event_name(state):
+    return state['stage'] if state['stage'] in FINAL_STAGES else 'progress'
+
+
+def progress_events(tracker, max_seconds=MAX_STREAM_SECONDS):
+    """
+    SSE stream of a tracker: the current state, then every change until the
+    report finishes or max_seconds pass (the client then reconnects).
+    Changes that happen between two reads are coalesced into the latest state.
+    """
+    yield f'retry: {RECONNECT_MS}\n\n'
+    deadline = time.monotonic() + max_seconds
+    seq = None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        new_seq, state = tracker.wait(seq, min(KEEPALIVE_SECONDS, remaining))
+        if new_seq == seq:
+            yield ': keepalive\n\n'
+            continue
+        seq = new_seq
+        yield sse_event(event_name(state), state, seq)
+        if state['stage'] in FINAL_STAGES:
+            return
+
+
+def status_events(state):
+    """SSE stream of a single state, for reports without a tracker in this process."""
+    yield f'retry: {RECONNECT_MS}\n\n'
+    yield sse_event(event_name(state), state)
@@ -0,0 +1,82 @@
+# seed_data.py
+"""
+Default rows used to seed an empty database.
+Originally hardcoded in data_processor.py before the mapping tables existed.
+"""
+
+# Brand name -> standardized reference name
+BRAND_MAPPINGS = {
+    '072LABO': '072LABO',
+    'AO': 'A-one',
+    "AVS Collector's": "AVS Collector's",
+    'FANTASTICBABY': 'FANTASTICBABY',
+    'HP': 'Hotpowers',
+    'ME': 'MagicEyes',
+    'PT': 'Peach Toys',
+    'RJ': 'Ride Japan',
+    'TH': 'Toys Heart',
+    'TMT': 'Tamatoys',
+    'アリスJAPAN': '爱丽丝',
+    'キテルキテル': 'Kiteru Kiteru',
+    'ハトプラ': 'EXE',
+    'ハトプラ(EXE)': 'EXE',
+    'ハトプラ(GPRO)': 'EXE',
+    'ハトプラ(HATOPLA)': 'EXE',
+    'ハトプラ(PPP)': 'EXE',
+}
+
+# Product names matched as substrings of 品名
+KNOWN_NAMES = [
+    '体位DX',
+    '赤貝乳豆スクラブ',
+    'オナホ屋さんのだ液汁',
+    '胡夢',
+    '有坂深雪',
+    'ポンコツガーディアンユニバース ユニコーンプレミアム肉厚ファビュラス',
+    '幼馴染',
+    'PUNIVIRGIN[ぷにばーじん]1000 ふわとろ',
+    'Chu！［チュッ！］',
+    'JAPANESE REAL HOLE',
+    'ぷにあなSPDX ',
+    'ぷにあなミラクル爆乳DX',
+    '網',
+    'けもろーしょん',
+    '対魔忍',
+    'ZARA GYUGYU',
+    'すじまん くぱぁ ココロ',
+    '極彩ウテルス ',
+    'オナシー',
+    'ろりんこ創世記ナマイキHARD',
+    '疑似ちつ ツブびら淫スパイラル　すけすけ',
+    '激フェラ',
+    'まる剥がしリアル 八乃つばさ',
+    'フェラ お口でちゅくします',
+    '名器覚醒',
+    '素人リアル',
+    '名器の証明',
+    '地雷系女子パンキーメッシュ',
+    'ポロンコロン',
+    '欲情',
+    '処女くぱぁ',
+    'おなつゆ(onatsuyu)370ml',
+    "あほすたさん印の母乳ローション(Fake mother's milk Lubricant)",
+    '現役JD',
+    '匂い',
+    'プルルンおっぱいニプルファック',
+    '千鶴',
+    '制服美少女',
+    '先輩',
+    '爆乳',
+    '三芳の愛液',
+    '360 FETISH 潮SPLASH',
+    'チクニー＆チクパコ',
+    'ONA砲',
+    'オナホルダー',
+    'AVミニ名器',
+    '真実の口',
+    'あこがれの美少女ブルマ',
+    '名器創生',
+    '素人リアル',
+    '日本のローション',
+]
+
@@ -6,6 +6,7 @@ Test script to verify auto-update functionality for product mappings.
 from database import db, ProductMapping
 from app import app
 from data_processor import process_manufacturer_data
+from upload_catalog import catalog_paths
 import os
 
 def test_auto_update():
@@ -21,16 +22,16 @@ def test_auto_update():
         for p in sample:
             print(f'   - {p.product_name}: weight={p.box_weight}, size={p.box_size}')
 
-        # Find a test file
+        # Find a manufacturer file through the upload catalog
         uploads_dir = 'uploads'
-        test_files = [f for f in os.listdir(uploads_dir) if f.endswith(('.xlsx', '.xls'))]
+        test_files = catalog_paths(uploads_dir, ['manufacturer'])
 
         if not test_files:
-            print('\n❌ No test files found in uploads/ directory')
+            print('\n❌ No manufacturer files found in uploads/ directory')
             return
 
-        test_file = os.path.join(uploads_dir, test_files[0])
-        print(f'\n🔄 Processing test file: {test_files[0]}')
+        test_file = test_files[0]
+        print(f'\n🔄 Processing test file: {os.path.basename(test_file)}')
         print()
 
         # Process the file
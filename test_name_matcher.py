@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Regression tests for 品名 canonicalization: spelling variants of a mapped
+name must resolve to the ProductMapping spelling, with its weight and size,
+whether they hit by normalized key or by substring.
+
+Runs without a database (the snapshot carries no table versions).
+"""
+
+import pandas as pd
+from name_matcher import MappingSnapshot
+from data_processor import process_manufacturer_data
+
+MAPPED = '極彩ウテルス'
+
+
+def make_snapshot():
+    return MappingSnapshot(
+        known_names=['極彩ウテルス ', 'ABC '],
+        product_mappings={
+            MAPPED: {'weight': 9.0, 'size': '10x10x10'},
+            'ＡＢＣ': {'weight': 1.0, 'size': None},
+        },
+        brand_mappings={},
+    )
+
+
+def test_exact_key_prefers_product_mapping_spelling():
+    snapshot = make_snapshot()
+    for raw in ('ＡＢＣ', 'ABC ', 'abc'):
+        resolved = snapshot.resolve(raw)
+        assert resolved['canonical_name'] == 'ＡＢＣ', raw
+        assert resolved['box_weight'] == 1.0, raw
+
+
+def test_variants_of_mapped_name_share_its_weight():
+    snapshot = make_snapshot()
+    variants = {
+        MAPPED: 'exact',
+        MAPPED + ' ': 'exact',                 # trailing space (the KNOWN_NAMES spelling)
+        '極彩ウテルス　': 'exact',           # full-width space
+        '新 極彩ウテルス 限定': 'substring',
+    }
+    for raw, match_type in variants.items():
+        resolved = snapshot.resolve(raw)
+        assert resolved['canonical_name'] == MAPPED, raw
+        assert resolved['match_type'] == match_type, raw
+        assert resolved['box_weight'] == 9.0, raw
+        assert resolved['box_size'] == '10x10x10', raw
+
+
+def test_variants_aggregate_into_one_summary_group(tmp_path):
+    path = tmp_path / 'maker.xlsx'
+    pd.DataFrame({
+        '品牌': ['A-one'] * 3,
+        '品名': [MAPPED, '新 極彩ウテルス 限定', MAPPED + ' '],
+        '型番': ['M1', 'M2', 'M3'],
+        'Pcs': [1, 2, 3],
+        'Price': [1000, 1000, 1000],
+        'Total': [1000, 2000, 3000],
+        '分類': ['ADULT TOY'] * 3,
+        '産地': ['JP'] * 3,
+    }).to_excel(path, index=False)
+
+    for options in ({}, {'compact': True}, {'streaming': True}):
+        summary = process_manufacturer_data([str(path)], {'snapshot': make_snapshot(), **options})
+        assert list(summary['品名']) == [MAPPED], options
+        assert summary['数量'].iloc[0] == 6, options
+        assert summary['净重'].iloc[0] == 54.0, options
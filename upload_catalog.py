@@ -0,0 +1,197 @@
+# upload_catalog.py
+"""
+Catalog of the workbooks in the uploads folder.
+
+Each workbook is sniffed once: only its sheet names, header row and sheet
+dimensions are read (openpyxl read-only mode), never the data rows. The
+detected schema, content hash and row count are stored in uploaded_files,
+so tools that need "all manufacturer files" or "all mapping sources" query
+the catalog instead of parsing every workbook. Entries are re-sniffed when
+a file's size or mtime no longer match.
+"""
+import hashlib
+import json
+import os
+# database is imported inside the catalog functions so sniffing works
+# without Flask or a database (report_cli)
+
+# Required columns per schema; a tuple means any one of those columns
+SCHEMAS = {
+    # Mapping sources also carry 日文名字, so they are checked first
+    'mapping_source': ['日文名字', '规格', '单件净重(kg)'],
+    'manufacturer': ['品牌', ('品名', '日文名字'), 'Pcs', 'Price'],
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def is_excel_file(filename):
+    return filename.lower().endswith(('.xlsx', '.xls')) and not filename.startswith('~$')
+
+
+def file_digest(path):
+    """sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sniff_workbook(path):
+    """
+    Read a workbook's sheet names, first-sheet header and data row count
+    without loading its rows.
+
+    Returns:
+        dict with sheet_names, columns and row_count (None when unknown)
+    """
+    if path.lower().endswith('.xls'):
+        # Legacy .xls: xlrd parses the whole file anyway, but pandas reads no rows
+        import pandas as pd
+        with pd.ExcelFile(path) as excel:
+            columns = [str(c) for c in pd.read_excel(excel, nrows=0).columns]
+            sheet = excel.book.sheet_by_index(0)
+            return {
+                'sheet_names': list(excel.sheet_names),
+                'columns': columns,
+                'row_count': max(sheet.nrows - 1, 0),
+            }
+
+    from openpyxl import load_workbook
+    from workbook_reader import header_names
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        columns = [str(c) for c in header_names(header)] if header else []
+        # max_row comes from the sheet's <dimension> element; it is None when
+        # the writer omitted it, and may include trailing blank rows
+        max_row = sheet.max_row
+        return {
+            'sheet_names': list(workbook.sheetnames),
+            'columns': columns,
+            'row_count': max(max_row - 1, 0) if max_row else None,
+        }
+    finally:
+        workbook.close()
+
+
+def detect_schema(columns):
+    """
+    Match a header against SCHEMAS.
+
+    Returns:
+        (schema name or None, missing columns of the closest schema)
+    """
+    present = set(columns)
+    closest = None
+    for name, required in SCHEMAS.items():
+        missing = ['/'.join(c) if isinstance(c, tuple) else c
+                   for c in required
+                   if not (present.intersection(c) if isinstance(c, tuple) else c in present)]
+        if not missing:
+            return name, []
+        if closest is None or len(missing) < len(closest):
+            closest = missing
+    return None, closest or []
+
+
+def inspect_workbook(path):
+    """
+    sniff_workbook() plus schema detection, without raising on unreadable files.
+
+    Returns:
+        dict with sheet_names, columns, row_count, schema, missing and error
+    """
+    try:
+        sniffed = sniff_workbook(path)
+        schema, missing = detect_schema(sniffed['columns'])
+        return {**sniffed, 'schema': schema, 'missing': missing, 'error': None}
+    except Exception as e:
+        return {'sheet_names': [], 'columns': [], 'row_count': None, 'schema': None, 'missing': [], 'error': str(e)}
+
+
+def catalog_file(path, commit=True, inspected=None):
+    """
+    Sniff one workbook and upsert its uploaded_files entry.
+    Unreadable workbooks are cataloged with their error and no schema.
+
+    Args:
+        inspected: inspect_workbook() result for this file's contents, when
+            the caller already has it (e.g. sniffed under a temporary name)
+
+    Returns:
+        the UploadedFile entry
+    """
+    from database import db, UploadedFile
+
+    filename = os.path.basename(path)
+    stat = os.stat(path)
+    entry = db.session.execute(
+        db.select(UploadedFile).where(UploadedFile.filename == filename)
+    ).scalar_one_or_none()
+    if entry is None:
+        entry = UploadedFile(filename=filename)
+        db.session.add(entry)
+
+    inspected = inspected or inspect_workbook(path)
+
+    entry.content_hash = file_digest(path)
+    entry.file_size = stat.st_size
+    entry.modified_ns = stat.st_mtime_ns
+    entry.sheet_names = json.dumps(inspected['sheet_names'], ensure_ascii=False)
+    entry.columns = json.dumps(inspected['columns'], ensure_ascii=False)
+    entry.row_count = inspected['row_count']
+    entry.detected_schema = inspected['schema']
+    entry.missing_columns = json.dumps(inspected['missing'], ensure_ascii=False)
+    entry.error = inspected['error']
+
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return entry
+
+
+def is_stale(entry, path):
+    stat = os.stat(path)
+    return entry.file_size != stat.st_size or entry.modified_ns != stat.st_mtime_ns
+
+
+def sync_catalog(uploads_dir, commit=True):
+    """
+    Bring the catalog in line with the uploads folder: sniff new or changed
+    workbooks and drop entries whose file is gone.
+
+    Returns:
+        list of (path, UploadedFile) in filename order
+    """
+    from database import db, UploadedFile
+
+    filenames = sorted(f for f in os.listdir(uploads_dir) if is_excel_file(f)) if os.path.isdir(uploads_dir) else []
+    entries = {e.filename: e for e in db.session.execute(db.select(UploadedFile)).scalars()}
+
+    for filename, entry in entries.items():
+        if filename not in filenames:
+            db.session.delete(entry)
+
+    catalog = []
+    for filename in filenames:
+        path = os.path.join(uploads_dir, filename)
+        entry = entries.get(filename)
+        if entry is None or is_stale(entry, path):
+            entry = catalog_file(path, commit=False)
+        catalog.append((path, entry))
+
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return catalog
+
+
+def catalog_paths(uploads_dir, schemas, commit=True):
+    """Paths of the workbooks in uploads_dir whose detected schema is one of `schemas`, in filename order."""
+    return [path for path, entry in sync_catalog(uploads_dir, commit=commit) if entry.detected_schema in schemas]
@@ -0,0 +1,114 @@
+# workbook_reader.py
+"""
+Parallel, column-selective reading of Excel workbooks.
+
+Only the requested columns are materialized, and files are parsed in a
+process pool because openpyxl parsing is CPU bound. iter_excel_chunks()
+streams a sheet in fixed-size row chunks for inputs too large to load at once.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+
+def read_columns(path, columns):
+    """
+    Read the given columns from the first sheet of a workbook.
+
+    Returns:
+        (DataFrame with the columns that exist, list of missing columns)
+    """
+    wanted = set(columns)
+    df = pd.read_excel(path, usecols=lambda c: c in wanted)
+    missing = [c for c in columns if c not in df.columns]
+    return df, missing
+
+
+def read_workbooks(paths, columns, max_workers=None):
+    """
+    Read many workbooks in parallel, keeping the input order.
+
+    Returns:
+        list of (path, DataFrame or None, missing columns, error message or None)
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+
+    workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    results = []
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                df, missing = read_columns(path, columns)
+                results.append((path, df, missing, None))
+            except Exception as e:
+                results.append((path, None, [], str(e)))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(read_columns, path, columns) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                df, missing = future.result()
+                results.append((path, df, missing, None))
+            except Exception as e:
+                results.append((path, None, [], str(e)))
+    return results
+
+
+def header_names(header):
+    """Column names the way pd.read_excel builds them: blanks become 'Unnamed: i', repeats get '.n'."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f'Unnamed: {i}' if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_excel_chunks(path, chunk_rows=5000):
+    """
+    Yield the first sheet of a workbook as object-dtype DataFrames of at most
+    `chunk_rows` rows, without ever holding the whole sheet in memory.
+
+    .xlsx files are streamed with openpyxl's read-only mode. Cell values are
+    kept as written (no per-column dtype inference), and fully blank rows are
+    skipped as pd.read_excel does. Legacy .xls files can't be streamed, so
+    they are read whole and then sliced.
+    """
+    if path.lower().endswith('.xls'):
+        df = pd.read_excel(path, dtype=object)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = header_names(header)
+        width = len(columns)
+
+        chunk = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns, dtype=object)
+    finally:
+        workbook.close()